@@ -0,0 +1,265 @@
+"""
+Precomputed dashboard aggregates for the published rankings
+
+Usage:
+    python aggregates.py [--force]
+
+Everything main.py shows is a function of the snapshot and the selected
+top N, so it's computed once per published version, for every top N
+option, and written next to the published CSV as
+published/atp_rankings.<hash>.aggregates.json. The dashboard renders from
+that file and only falls back to computing it when it's missing.
+"""
+import argparse
+import csv
+import hashlib
+import io
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from delta_store import row_width
+from publish import file_hash, read_published, write_atomic
+from rankings_data import load_rankings
+from snapshots import SNAPSHOT_HEADER
+
+TOP_N_OPTIONS = [10, 20, 50, 100, 200, 500, 1000]
+
+# Bumped whenever the layout below changes, older files are recomputed
+AGGREGATES_VERSION = 2
+
+# Population data for top tennis countries (in millions, 2023 estimates)
+POPULATION_DATA = {
+    "USA": 331.9, "ESP": 47.4, "FRA": 67.8, "GBR": 67.3, "ITA": 60.3,
+    "ARG": 45.8, "AUS": 25.7, "GER": 83.1, "SUI": 8.7, "CAN": 38.2,
+    "JPN": 125.7, "CZE": 10.7, "SRB": 6.9, "AUT": 9.0, "NED": 17.4,
+    "POL": 37.8, "CRO": 4.0, "BRA": 213.4, "RSA": 60.0, "BEL": 11.6,
+    "POR": 10.3, "SWE": 10.4, "NOR": 5.4, "GRE": 10.6, "CHN": 1412.0,
+    "CHI": 19.2  # Chile
+}
+
+# Country to continent mapping
+CONTINENT_MAPPING = {
+    # Europe
+    "ESP": "Europe", "FRA": "Europe", "GBR": "Europe", "ITA": "Europe",
+    "GER": "Europe", "SUI": "Europe", "CZE": "Europe", "SRB": "Europe",
+    "AUT": "Europe", "NED": "Europe", "POL": "Europe", "CRO": "Europe",
+    "BEL": "Europe", "POR": "Europe", "SWE": "Europe", "NOR": "Europe",
+    "GRE": "Europe", "BUL": "Europe", "ROU": "Europe", "HUN": "Europe",
+    "SVK": "Europe", "FIN": "Europe", "DEN": "Europe", "UKR": "Europe",
+    "LAT": "Europe", "EST": "Europe", "LTU": "Europe", "SLO": "Europe",
+    "MDA": "Europe", "RUS": "Europe", "BLR": "Europe", "MNE": "Europe",
+    "BIH": "Europe", "LUX": "Europe", "IRL": "Europe", "ISL": "Europe",
+
+    # North America
+    "USA": "North America", "CAN": "North America", "MEX": "North America",
+    "DOM": "North America", "PUR": "North America",
+
+    # South America
+    "ARG": "South America", "BRA": "South America", "CHI": "South America",
+    "COL": "South America", "URU": "South America", "ECU": "South America",
+    "PER": "South America", "VEN": "South America", "BOL": "South America",
+    "PAR": "South America",
+
+    # Asia
+    "JPN": "Asia", "CHN": "Asia", "KOR": "Asia", "IND": "Asia",
+    "TPE": "Asia", "UZB": "Asia", "KAZ": "Asia", "THA": "Asia",
+    "HKG": "Asia", "PAK": "Asia", "MAS": "Asia", "SIN": "Asia",
+
+    # Oceania
+    "AUS": "Oceania", "NZL": "Oceania",
+
+    # Africa
+    "RSA": "Africa", "TUN": "Africa", "MAR": "Africa", "EGY": "Africa",
+    "ALG": "Africa", "ZIM": "Africa", "NGR": "Africa", "KEN": "Africa"
+}
+
+# Age Distribution Grouped by 5-Year Intervals
+AGE_BINS = list(range(15, 51, 5))  # 16-20, 21-25, ..., 46-50
+AGE_LABELS = [f"{b}-{b+4}" for b in AGE_BINS[:-1]]
+
+
+def aggregates_file(published_file):
+    return f"{os.path.splitext(published_file)[0]}.aggregates.json"
+
+
+def aggregate_top_n(df_top_n):
+    """
+    Everything the dashboard shows for one top N, as plain JSON values
+    """
+    df_top_n = df_top_n.copy()
+    # Country is categorical: drop countries outside the top N so counts skip them
+    df_top_n["Country"] = df_top_n["Country"].cat.remove_unused_categories()
+
+    # Generate the count of players by country
+    country_counts = df_top_n["Country"].value_counts().reset_index()
+    country_counts.columns = ["Country", "Number of Players"]
+
+    # Age Analysis
+    age_values = df_top_n["Age"].dropna()
+    q1, q3 = np.percentile(age_values, [25, 75])
+    age_stats = {
+        "min": int(df_top_n["Age"].min()),
+        "max": int(df_top_n["Age"].max()),
+        "mean": float(np.mean(age_values)),
+        "median": float(df_top_n["Age"].median()),
+        "q1": float(q1),
+        "q3": float(q3),
+        "std": float(df_top_n["Age"].std()),
+    }
+
+    df_top_n["Age Group"] = pd.cut(
+        df_top_n["Age"], bins=AGE_BINS, labels=AGE_LABELS, right=True)
+    age_group_counts = df_top_n["Age Group"].value_counts().sort_index()
+
+    # Players per million: one map and divide, countries without
+    # population data drop out as NaN
+    country_counts_all = country_counts.copy()
+    country_counts_all["Population (M)"] = country_counts_all["Country"].astype(str).map(POPULATION_DATA)
+    country_counts_all["Players per Million"] = (
+        country_counts_all["Number of Players"] / country_counts_all["Population (M)"])
+    country_counts_all = country_counts_all.dropna(subset=["Players per Million"])
+
+    # Sort by players per million and get top 15
+    top_per_capita = country_counts_all.sort_values(
+        "Players per Million", ascending=False).head(15)
+
+    # Add continent to the dataframe
+    df_top_n["Continent"] = df_top_n["Country"].astype(str).map(CONTINENT_MAPPING)
+
+    # Count players by continent
+    continent_counts = df_top_n["Continent"].value_counts().reset_index()
+    continent_counts.columns = ["Continent", "Number of Players"]
+
+    # Calculate percentage
+    total_players = continent_counts["Number of Players"].sum()
+    continent_counts["Percentage"] = (
+        continent_counts["Number of Players"] / total_players * 100).round(1)
+
+    # Sort by number of players
+    continent_counts = continent_counts.sort_values(
+        "Number of Players", ascending=False)
+
+    # Top country per continent from one grouped count; idxmax() keeps the
+    # first of tied countries in category (first appearance) order
+    per_continent = df_top_n.groupby(["Continent", "Country"], observed=True).size()
+    top_pairs = per_continent.groupby(level="Continent").idxmax()
+    top_country_per_continent = [
+        [continent, str(top_pairs[continent][1]), int(per_continent[top_pairs[continent]])]
+        for continent in continent_counts["Continent"]]
+
+    # Age stats and box plot data of the top 8 countries by player count,
+    # in one groupby
+    top_countries = country_counts["Country"].head(8)
+    top_countries_data = df_top_n[df_top_n["Country"].isin(top_countries)].dropna(subset=["Age"])
+    ages_by_country = top_countries_data.groupby("Country", observed=True)["Age"]
+    # Series.round() rounds like numpy, which can differ from round() on a float
+    stats = ages_by_country.agg(["count", "min", "max", "mean", "median"]).round(1)
+    ages = ages_by_country.agg(list)
+
+    age_stats_by_country = [{
+        "Country": str(country),
+        "Ages": [int(age) for age in ages[country]],
+        "Count": int(stats.at[country, "count"]),
+        "Min Age": int(stats.at[country, "min"]),
+        "Max Age": int(stats.at[country, "max"]),
+        "Mean Age": float(stats.at[country, "mean"]),
+        "Median Age": float(stats.at[country, "median"]),
+    } for country in top_countries if country in stats.index]
+
+    return {
+        "country_counts": [[str(c), int(n)] for c, n in country_counts.itertuples(index=False)],
+        "ages": age_values.astype(int).tolist(),
+        "age_stats": age_stats,
+        "age_groups": [[str(g), int(n)] for g, n in age_group_counts.items()],
+        "per_capita": [[str(c), int(n), float(p), float(r)]
+                       for c, n, p, r in top_per_capita.itertuples(index=False)],
+        "continents": [[c, int(n), float(p)] for c, n, p in continent_counts.itertuples(index=False)],
+        "top_country_per_continent": top_country_per_continent,
+        "top_countries": age_stats_by_country,
+    }
+
+
+def build_aggregates(df):
+    """
+    Aggregates for every top N option, df sorted by rank
+    """
+    return {
+        "version": AGGREGATES_VERSION,
+        "rows": len(df),
+        "top_n": {str(n): aggregate_top_n(df.head(n)) for n in TOP_N_OPTIONS},
+    }
+
+
+def compute_aggregates(published_file):
+    """
+    build_aggregates() of a published file, tagged with the file's hash
+    """
+    aggregates = build_aggregates(load_rankings(published_file).sort_values(by="Rank"))
+    aggregates["sha256"] = file_hash(published_file)
+    return aggregates
+
+
+def snapshot_csv(rows):
+    """
+    Snapshot rows from the snapshot store as CSV text, in save_to_csv() format
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(SNAPSHOT_HEADER[:row_width(rows)])
+    writer.writerows(rows)
+    return buffer.getvalue()
+
+
+def compute_snapshot_aggregates(rows):
+    """
+    build_aggregates() of a snapshot read from the snapshot store, tagged
+    with the hash of its CSV form
+    """
+    text = snapshot_csv(rows)
+    aggregates = build_aggregates(load_rankings(io.StringIO(text)).sort_values(by="Rank"))
+    aggregates["sha256"] = hashlib.sha256(text.encode("utf-8")).hexdigest()
+    return aggregates
+
+
+def read_aggregates(published_file):
+    """
+    The precomputed aggregates of published_file, None when they're
+    missing or from an older layout
+    """
+    path = aggregates_file(published_file)
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        aggregates = json.load(f)
+    return aggregates if aggregates.get("version") == AGGREGATES_VERSION else None
+
+
+def write_aggregates(published_file=None, force=False):
+    """
+    Compute and store the aggregates of the live rankings table (or
+    published_file). Returns the file written, None when already up to date.
+    """
+    if published_file is None:
+        published_file, _ = read_published()
+    if not force and read_aggregates(published_file) is not None:
+        return None
+
+    path = aggregates_file(published_file)
+    write_atomic(path, json.dumps(compute_aggregates(published_file), separators=(",", ":")))
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--force", action="store_true", help="recompute even when up to date")
+    args = parser.parse_args()
+
+    path = write_aggregates(force=args.force)
+    print(f"Wrote {path}" if path else "Aggregates already up to date")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,282 @@
+"""
+Read-only JSON API over the published rankings and their aggregates
+
+Usage:
+    python api.py [--host 127.0.0.1] [--port 8081]
+
+Endpoints, where <date> is "latest" or a date in the snapshot store
+(YYYY-MM-DD) and top_n is one of the dashboard's options (default 100):
+    /api/dates                          dates that can be asked for
+    /api/<date>/rankings[?limit=100]    the rankings table
+    /api/<date>/countries[?top_n=100]   players per country in the top N
+    /api/<date>/ages[?top_n=100]        age stats and age groups of the top N
+    /api/<date>/continents[?top_n=100]  continent breakdown of the top N
+
+Everything comes from the same files and aggregates the dashboard uses.
+Responses carry a strong ETag (hash of the body) and a Cache-Control max
+age, and a matching If-None-Match is answered with 304. Bodies are kept
+in memory per snapshot version, so a repeat request only stats a file.
+"""
+import argparse
+import asyncio
+import hashlib
+import io
+import json
+import os
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from urllib.parse import parse_qs, urlsplit
+
+from aggregates import TOP_N_OPTIONS, compute_aggregates, compute_snapshot_aggregates, read_aggregates, snapshot_csv
+from delta_store import SnapshotStore, store_version
+from publish import read_published
+from rankings_data import load_rankings
+
+API_HOST = os.environ.get("API_HOST", "127.0.0.1")
+API_PORT = int(os.environ.get("API_PORT", "8081"))
+
+# Seconds clients and proxies may reuse a response without asking again.
+# Latest changes with every publish, a past date practically never.
+LATEST_MAX_AGE = int(os.environ.get("API_LATEST_MAX_AGE", "300"))
+HISTORY_MAX_AGE = int(os.environ.get("API_HISTORY_MAX_AGE", "86400"))
+
+# Response bodies kept in memory, least recently used dropped first
+API_CACHE_SIZE = int(os.environ.get("API_CACHE_SIZE", "256"))
+
+SOURCE = "atp_rankings"
+
+
+class ApiError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def snapshot_version(day):
+    """
+    What identifies the current content of a date: the published file and
+    its mtime for "latest", the store index mtime for a stored date
+    """
+    if day == "latest":
+        path, updated = read_published()
+        return path, updated, os.stat(path).st_mtime_ns
+    return day, day, store_version()
+
+
+@lru_cache(maxsize=2)
+def snapshot_store(version):
+    return SnapshotStore(SOURCE)
+
+
+def stored_rows(day, version):
+    store = snapshot_store(version)
+    if day not in store.index:
+        raise ApiError(404, f"no snapshot for {day}")
+    return store.read(day)
+
+
+@lru_cache(maxsize=16)
+def load_aggregates(key, version):
+    if key.endswith(".csv"):
+        return read_aggregates(key) or compute_aggregates(key)
+    return compute_snapshot_aggregates(stored_rows(key, version))
+
+
+def load_table(key, version):
+    if key.endswith(".csv"):
+        df = load_rankings(key)
+    else:
+        df = load_rankings(io.StringIO(snapshot_csv(stored_rows(key, version))))
+    return df.sort_values(by="Rank")
+
+
+def top_n_param(query):
+    try:
+        top_n = int(query.get("top_n", ["100"])[0])
+    except ValueError:
+        top_n = None
+    if top_n not in TOP_N_OPTIONS:
+        raise ApiError(400, f"top_n must be one of {TOP_N_OPTIONS}")
+    return top_n
+
+
+def rankings_payload(key, version, query):
+    try:
+        limit = int(query.get("limit", ["0"])[0])
+    except ValueError:
+        raise ApiError(400, "limit must be a number")
+    df = load_table(key, version)
+    if limit > 0:
+        df = df.head(limit)
+    # Missing values (no age, no movement baseline) become null
+    df = df.astype(object).where(df.notna(), None)
+    return {"rows": len(df), "rankings": df.to_dict(orient="records")}
+
+
+def countries_payload(key, version, query):
+    top_n = top_n_param(query)
+    agg = load_aggregates(key, version)["top_n"][str(top_n)]
+    return {"top_n": top_n, "countries": [
+        {"country": country, "players": players} for country, players in agg["country_counts"]]}
+
+
+def ages_payload(key, version, query):
+    top_n = top_n_param(query)
+    agg = load_aggregates(key, version)["top_n"][str(top_n)]
+    return {"top_n": top_n, "age_stats": agg["age_stats"], "age_groups": [
+        {"age_group": group, "players": players} for group, players in agg["age_groups"]]}
+
+
+def continents_payload(key, version, query):
+    top_n = top_n_param(query)
+    agg = load_aggregates(key, version)["top_n"][str(top_n)]
+    return {
+        "top_n": top_n,
+        "continents": [{"continent": continent, "players": players, "percentage": percentage}
+                       for continent, players, percentage in agg["continents"]],
+        "top_country_per_continent": [{"continent": continent, "country": country, "players": players}
+                                      for continent, country, players in agg["top_country_per_continent"]],
+    }
+
+
+ENDPOINTS = {
+    "rankings": rankings_payload,
+    "countries": countries_payload,
+    "ages": ages_payload,
+    "continents": continents_payload,
+}
+
+
+class ResponseCache:
+    """
+    (ETag, body) per (snapshot version, path, query), shared by every connection
+    """
+
+    def __init__(self, size=API_CACHE_SIZE):
+        self.size = size
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                return self.entries[key]
+        return None
+
+    def put(self, key, value):
+        with self.lock:
+            self.entries[key] = value
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+
+
+def encode(payload):
+    body = json.dumps(payload, separators=(",", ":"), default=str).encode("utf-8")
+    return f'"{hashlib.sha256(body).hexdigest()[:32]}"', body
+
+
+def respond(cache, target):
+    """
+    (status, ETag, max age, body) for a request target. Runs in a worker
+    thread, loading a snapshot may take a while.
+    """
+    url = urlsplit(target)
+    query = parse_qs(url.query)
+    parts = url.path.strip("/").split("/")
+
+    if parts == ["api", "dates"]:
+        version = store_version()
+        key = ("dates", version)
+        cached = cache.get(key)
+        if cached is None:
+            cached = encode({"dates": ["latest"] + snapshot_store(version).dates()})
+            cache.put(key, cached)
+        return 200, cached[0], LATEST_MAX_AGE, cached[1]
+
+    if len(parts) != 3 or parts[0] != "api" or parts[2] not in ENDPOINTS:
+        raise ApiError(404, "not found")
+
+    day = parts[1]
+    if day != "latest" and day not in snapshot_store(store_version()).index:
+        raise ApiError(404, f"no snapshot for {day}")
+
+    key, updated, version = snapshot_version(day)
+    cache_key = (key, version, url.path, url.query)
+    cached = cache.get(cache_key)
+    if cached is None:
+        payload = {"date": updated, **ENDPOINTS[parts[2]](key, version, query)}
+        cached = encode(payload)
+        cache.put(cache_key, cached)
+    max_age = LATEST_MAX_AGE if day == "latest" else HISTORY_MAX_AGE
+    return 200, cached[0], max_age, cached[1]
+
+
+STATUS_TEXT = {200: "OK", 304: "Not Modified", 400: "Bad Request", 404: "Not Found",
+               405: "Method Not Allowed", 500: "Internal Server Error"}
+
+
+async def handle_request(cache, reader, writer):
+    try:
+        request_line = await reader.readline()
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        parts = request_line.decode("latin-1").split()
+        method, target = (parts[0], parts[1]) if len(parts) > 1 else ("GET", "/")
+        etag = None
+        max_age = 0
+        try:
+            if method not in ("GET", "HEAD"):
+                raise ApiError(405, "read-only API, use GET")
+            status, etag, max_age, body = await asyncio.to_thread(respond, cache, target)
+        except ApiError as e:
+            status, body = e.status, json.dumps({"error": str(e)}).encode("utf-8")
+        except Exception as e:
+            print(f"API error on {target}: {e}", flush=True)
+            status, body = 500, b'{"error": "internal error"}'
+
+        if etag and etag in [tag.strip() for tag in headers.get("if-none-match", "").split(",")]:
+            status, body = 304, b""
+
+        head = [f"HTTP/1.1 {status} {STATUS_TEXT[status]}"]
+        if etag:
+            head += [f"ETag: {etag}", f"Cache-Control: public, max-age={max_age}"]
+        else:
+            head.append("Cache-Control: no-store")
+        if status != 304:
+            head += ["Content-Type: application/json", f"Content-Length: {len(body)}"]
+        head += ["Access-Control-Allow-Origin: *", "Connection: close"]
+
+        writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1"))
+        if method != "HEAD":
+            writer.write(body)
+        await writer.drain()
+    finally:
+        writer.close()
+
+
+async def serve(host=API_HOST, port=API_PORT):
+    cache = ResponseCache()
+    server = await asyncio.start_server(lambda r, w: handle_request(cache, r, w), host, port)
+    print(f"Rankings API listening on http://{host}:{port}/api/dates", flush=True)
+    async with server:
+        await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default=API_HOST)
+    parser.add_argument("--port", type=int, default=API_PORT)
+    args = parser.parse_args()
+    asyncio.run(serve(args.host, args.port))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+"""
+Micro-benchmark: vectorized dashboard aggregates vs the per-row and
+per-group loops they replaced
+
+Usage:
+    python benchmarks/bench_aggregates.py [--rows 100000] [--repeat 20]
+
+Times aggregates.aggregate_top_n() against the previous loop-based
+version on the top 1000 of the latest snapshot and on a synthetic frame
+of --rows players drawn from its country and age distribution, checking
+both give the same result. The bar chart hovertext is timed separately,
+iterrows() vs string concatenation.
+"""
+import argparse
+import glob
+import os
+import sys
+import timeit
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.join(HERE, "..")
+sys.path.insert(0, ROOT)
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+
+import aggregates  # noqa: E402
+from rankings_data import compact, load_rankings  # noqa: E402
+
+
+def aggregate_top_n_loops(df_top_n):
+    """
+    aggregates.aggregate_top_n() as it was before vectorizing: row-wise
+    apply() and one filter per continent and per country
+    """
+    df_top_n = df_top_n.copy()
+    # Country is categorical: drop countries outside the top N so counts skip them
+    df_top_n["Country"] = df_top_n["Country"].cat.remove_unused_categories()
+
+    # Generate the count of players by country
+    country_counts = df_top_n["Country"].value_counts().reset_index()
+    country_counts.columns = ["Country", "Number of Players"]
+
+    # Age Analysis
+    age_values = df_top_n["Age"].dropna()
+    q1, q3 = np.percentile(age_values, [25, 75])
+    age_stats = {
+        "min": int(df_top_n["Age"].min()),
+        "max": int(df_top_n["Age"].max()),
+        "mean": float(np.mean(age_values)),
+        "median": float(df_top_n["Age"].median()),
+        "q1": float(q1),
+        "q3": float(q3),
+        "std": float(df_top_n["Age"].std()),
+    }
+
+    df_top_n["Age Group"] = pd.cut(
+        df_top_n["Age"], bins=aggregates.AGE_BINS, labels=aggregates.AGE_LABELS, right=True)
+    age_group_counts = df_top_n["Age Group"].value_counts().sort_index()
+
+    # Add population data and calculate players per million
+    country_counts_all = country_counts.copy()
+    country_counts_all["Population (M)"] = country_counts_all["Country"].map(
+        aggregates.POPULATION_DATA)
+    country_counts_all["Players per Million"] = country_counts_all.apply(
+        lambda row: row["Number of Players"] /
+        row["Population (M)"] if pd.notna(row["Population (M)"]) else None,
+        axis=1
+    )
+
+    # Filter out countries with missing population data
+    country_counts_all = country_counts_all.dropna(subset=["Players per Million"])
+
+    # Sort by players per million and get top 15
+    top_per_capita = country_counts_all.sort_values(
+        "Players per Million", ascending=False).head(15)
+
+    # Add continent to the dataframe
+    df_top_n["Continent"] = df_top_n["Country"].astype(str).map(aggregates.CONTINENT_MAPPING)
+
+    # Count players by continent
+    continent_counts = df_top_n["Continent"].value_counts().reset_index()
+    continent_counts.columns = ["Continent", "Number of Players"]
+
+    # Calculate percentage
+    total_players = continent_counts["Number of Players"].sum()
+    continent_counts["Percentage"] = (
+        continent_counts["Number of Players"] / total_players * 100).round(1)
+
+    # Sort by number of players
+    continent_counts = continent_counts.sort_values(
+        "Number of Players", ascending=False)
+
+    top_country_per_continent = []
+    for continent in continent_counts["Continent"]:
+        # Filter countries in this continent
+        continent_countries = df_top_n[df_top_n["Continent"]
+                                       == continent]["Country"].value_counts()
+        if not continent_countries.empty:
+            top_country_per_continent.append(
+                [continent, str(continent_countries.index[0]), int(continent_countries.iloc[0])])
+
+    # Get top 8 countries by player count
+    top_countries = df_top_n["Country"].value_counts().head(8).index.tolist()
+
+    # Filter data for these countries
+    top_countries_data = df_top_n[df_top_n["Country"].isin(top_countries)]
+
+    age_stats_by_country = []
+    for country in top_countries:
+        country_ages = top_countries_data[top_countries_data["Country"]
+                                          == country]["Age"].dropna()
+
+        # Skip if no data
+        if len(country_ages) > 0:
+            age_stats_by_country.append({
+                "Country": str(country),
+                "Ages": country_ages.astype(int).tolist(),
+                "Count": len(country_ages),
+                "Min Age": int(country_ages.min()),
+                "Max Age": int(country_ages.max()),
+                # numpy rounding, which can differ from round() on a float
+                "Mean Age": float(round(country_ages.mean(), 1)),
+                "Median Age": float(round(country_ages.median(), 1))
+            })
+
+    return {
+        "country_counts": [[str(c), int(n)] for c, n in country_counts.itertuples(index=False)],
+        "ages": age_values.astype(int).tolist(),
+        "age_stats": age_stats,
+        "age_groups": [[str(g), int(n)] for g, n in age_group_counts.items()],
+        "per_capita": [[str(c), int(n), float(p), float(r)]
+                       for c, n, p, r in top_per_capita.itertuples(index=False)],
+        "continents": [[c, int(n), float(p)] for c, n, p in continent_counts.itertuples(index=False)],
+        "top_country_per_continent": top_country_per_continent,
+        "top_countries": age_stats_by_country,
+    }
+
+
+def hovertext_loop(country_counts):
+    return [f"{row['Country']}: {row['Number of Players']} players" for _,
+            row in country_counts.iterrows()]
+
+
+def hovertext_vectorized(country_counts):
+    return (country_counts["Country"] + ": " +
+            country_counts["Number of Players"].astype(str) + " players").tolist()
+
+
+def synthetic_rankings(df, rows, seed=0):
+    """
+    rows players with countries and ages sampled from df
+    """
+    rng = np.random.default_rng(seed)
+    country = df["Country"].astype(str).to_numpy()
+    age = df["Age"].dropna().to_numpy()
+    return compact(pd.DataFrame({
+        # Ranks wrap around to fit compact()'s int16, nothing here sorts by them
+        "Rank": np.arange(1, rows + 1) % 32000,
+        "Player Name": [f"Player {i}" for i in range(rows)],
+        "Age": rng.choice(age, rows),
+        "Country": rng.choice(country, rows),
+        "Points": np.linspace(12000, 1, rows).astype(int),
+        "Change": pd.NA,
+    }))
+
+
+def compare(label, df, repeat):
+    before = aggregate_top_n_loops(df)
+    after = aggregates.aggregate_top_n(df)
+    if before != after:
+        raise SystemExit(f"{label}: results differ")
+
+    loops = min(timeit.repeat(lambda: aggregate_top_n_loops(df), number=1, repeat=repeat))
+    vectorized = min(timeit.repeat(lambda: aggregates.aggregate_top_n(df), number=1, repeat=repeat))
+    print(f"{label:<24} {loops * 1000:>9.1f} {vectorized * 1000:>11.1f} {loops / vectorized:>7.1f}x")
+
+    counts = pd.DataFrame(after["country_counts"], columns=["Country", "Number of Players"])
+    if hovertext_loop(counts) != hovertext_vectorized(counts):
+        raise SystemExit(f"{label}: hovertext differs")
+    loops = min(timeit.repeat(lambda: hovertext_loop(counts), number=1, repeat=repeat))
+    vectorized = min(timeit.repeat(lambda: hovertext_vectorized(counts), number=1, repeat=repeat))
+    print(f"{'  hovertext':<24} {loops * 1000:>9.2f} {vectorized * 1000:>11.2f} {loops / vectorized:>7.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000, help="rows in the synthetic frame")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    files = sorted(glob.glob(os.path.join(ROOT, "atp_rankings_data", "*.csv")))
+    if not files:
+        raise SystemExit("No snapshots in atp_rankings_data/")
+    df = load_rankings(files[-1]).sort_values(by="Rank")
+
+    print(f"{'frame':<24} {'loops ms':>9} {'vectorized':>11} {'speedup':>8}")
+    compare(f"top 1000 ({os.path.basename(files[-1])[13:23]})", df.head(1000), args.repeat)
+    compare(f"synthetic {args.rows} rows", synthetic_rankings(df, args.rows), max(1, args.repeat // 4))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Exercise the browserless HTTP fetcher offline against the replay server
+
+Usage: python benchmarks/bench_fetch.py [--runs 20]
+
+Checks that a recorded ranking page parses to the same rows as the fixture,
+that a bot-check page fails validation (so Chrome would be started), that
+a repeat fetch short-circuits on the ETag, and times fetches through the
+pooled keep-alive session against a new connection per request. Both
+loops only fetch, so the difference is the connection reuse alone.
+"""
+import argparse
+import os
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, ".."))
+
+import requests  # noqa: E402
+
+import http_fetch  # noqa: E402
+from rankings_parser import InvalidRankings, parse_rankings_html, validated  # noqa: E402
+from replay_server import fixture_path, start_replay_server  # noqa: E402
+from scrape_state import RankingsUnchanged  # noqa: E402
+
+
+def fetch_rows(url, state=None):
+    html, new_state = http_fetch.fetch_rankings_html(url, state)
+    return list(validated(parse_rankings_html(html))), new_state
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+
+    server, base_url = start_replay_server()
+    http_fetch.BASE_URL = base_url
+    url = http_fetch.rankings_url()
+
+    with open(fixture_path(url), encoding="utf-8") as f:
+        expected = list(parse_rankings_html(f.read()))
+
+    data, new_state = fetch_rows(url)
+    if data != expected:
+        print("HTTP fetch did not return the recorded rows!")
+        sys.exit(1)
+    print(f"Recorded page: {len(data)} rows parsed over HTTP")
+
+    try:
+        fetch_rows(base_url + "/en/blocked")
+        print("Bot-check page passed validation!")
+        sys.exit(1)
+    except InvalidRankings as e:
+        print(f"Bot-check page: rejected ({e}), Chrome fallback would start")
+
+    state = dict(new_state)
+    start = time.perf_counter()
+    try:
+        fetch_rows(url, state)
+        print("Repeat fetch with stored validators did not short-circuit!")
+        sys.exit(1)
+    except RankingsUnchanged as e:
+        print(f"Repeat fetch: {e} in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    start = time.perf_counter()
+    for _ in range(args.runs):
+        http_fetch.fetch_page(url)
+    pooled = (time.perf_counter() - start) / args.runs
+
+    start = time.perf_counter()
+    for _ in range(args.runs):
+        requests.get(url, headers={"Connection": "close"}, timeout=15).raise_for_status()
+    fresh = (time.perf_counter() - start) / args.runs
+
+    print(f"Pooled session:      {pooled * 1000:.1f} ms per fetch")
+    print(f"New connection each: {fresh * 1000:.1f} ms per fetch")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
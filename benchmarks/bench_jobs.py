@@ -0,0 +1,58 @@
+"""
+Time a multi-source scrape against the replay server
+
+Usage: python benchmarks/bench_jobs.py [--delay 0.5]
+
+Every source in scrape_jobs.json is served from the recorded ranking page
+with --delay seconds of server latency. Fetched concurrently, the total
+wall time should stay close to one page, not one page per source.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.join(HERE, "..")
+sys.path.insert(0, ROOT)
+# Keep benchmark players out of the real registry
+os.environ.setdefault("PLAYER_REGISTRY", os.path.join(tempfile.mkdtemp(), "players.csv"))
+
+import http_fetch  # noqa: E402
+from replay_server import FIXTURES, start_replay_server  # noqa: E402
+from scrape_jobs import load_jobs, scrape_jobs  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--delay", type=float, default=0.5)
+    args = parser.parse_args()
+
+    # Write the snapshots somewhere disposable
+    out_dir = tempfile.mkdtemp()
+    jobs = [dict(job, folder=os.path.join(out_dir, job["name"]))
+            for job in load_jobs(os.path.join(ROOT, "scrape_jobs.json"))]
+    fixture = os.path.join(FIXTURES, "atp_live_ranking.html")
+    server, base_url = start_replay_server(
+        pages={job["path"]: fixture for job in jobs}, delay=args.delay)
+    http_fetch.BASE_URL = base_url
+
+    start = time.perf_counter()
+    results = scrape_jobs(jobs, {}, max_workers=1)
+    sequential = time.perf_counter() - start
+
+    start = time.perf_counter()
+    results = scrape_jobs(jobs, {}, max_workers=len(jobs))
+    concurrent = time.perf_counter() - start
+
+    for job, status, filename in results:
+        print(f"{job['name']:<12} {status:<9} {filename}")
+    print(f"Server latency per page: {args.delay:.2f} s")
+    print(f"Sequential:  {sequential:.2f} s")
+    print(f"Concurrent:  {concurrent:.2f} s")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
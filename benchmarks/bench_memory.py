@@ -0,0 +1,58 @@
+"""
+Memory benchmark: bare pd.read_csv frames vs rankings_data.load_rankings()
+
+Usage:
+    python benchmarks/bench_memory.py [--days 1095]
+
+Loads every snapshot in atp_rankings_data/ both ways and reports bytes
+per frame (memory_usage(deep=True)), then projects --days daily
+snapshots held in RAM at once by stacking copies of the latest one.
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.join(HERE, "..")
+sys.path.insert(0, ROOT)
+
+import pandas as pd  # noqa: E402
+
+from rankings_data import load_rankings  # noqa: E402
+
+
+def frame_bytes(df):
+    return int(df.memory_usage(deep=True).sum())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--days", type=int, default=3 * 365,
+                        help="number of daily snapshots to project")
+    args = parser.parse_args()
+
+    files = sorted(glob.glob(os.path.join(ROOT, "atp_rankings_data", "*.csv")))
+    if not files:
+        raise SystemExit("No snapshots in atp_rankings_data/")
+
+    print(f"{'snapshot':<32} {'read_csv':>10} {'compact':>10} {'ratio':>6}")
+    for path in files:
+        naive = frame_bytes(pd.read_csv(path))
+        compact = frame_bytes(load_rankings(path))
+        print(f"{os.path.basename(path):<32} {naive:>10} {compact:>10} {naive / compact:>5.1f}x")
+
+    for name, load in (("read_csv", pd.read_csv), ("compact", load_rankings)):
+        started = time.perf_counter()
+        df = load(files[-1])
+        elapsed = time.perf_counter() - started
+        # Same frame repeated keeps the categories shared, like a real
+        # history where the set of countries barely changes
+        history = pd.concat([df] * args.days, ignore_index=True)
+        print(f"\n{name}: load {elapsed * 1000:.1f} ms, "
+              f"{args.days} days x {len(df)} rows = {frame_bytes(history) / 1e6:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
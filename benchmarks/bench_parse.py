@@ -0,0 +1,81 @@
+"""
+Compare the per-cell WebDriver parsing path with the page_source parser
+
+Usage: python benchmarks/bench_parse.py [--latency-ms 1.0] [--repeat 5]
+
+--latency-ms simulates the HTTP round trip to chromedriver for every
+WebDriver command; 1 ms is typical for a local headless Chrome.
+"""
+import argparse
+import os
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, ".."))
+
+from fake_webdriver import FakeDriver  # noqa: E402
+from ranking import extract_player_data  # noqa: E402
+from rankings_parser import parse_rankings_html  # noqa: E402
+
+FIXTURE = os.path.join(HERE, "fixtures", "atp_live_ranking.html")
+
+
+def per_cell_path(driver):
+    rows = driver.find_elements("css selector", "table tbody tr")
+    data = []
+    for row in rows:
+        player_data = extract_player_data(row)
+        if player_data:
+            data.append(player_data)
+    data.sort(key=lambda x: int(x[0]))
+    return data
+
+
+def page_source_path(driver):
+    return list(parse_rankings_html(driver.page_source))
+
+
+def best_of(func, html, latency, repeat):
+    best = None
+    for _ in range(repeat):
+        driver = FakeDriver(html, latency=latency)
+        start = time.perf_counter()
+        data = func(driver)
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best[0]:
+            best = (elapsed, data, driver.counter.calls)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--fixture", default=FIXTURE)
+    parser.add_argument("--latency-ms", type=float, default=1.0)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with open(args.fixture, encoding="utf-8") as f:
+        html = f.read()
+    latency = args.latency_ms / 1000
+
+    cell_time, cell_data, cell_calls = best_of(
+        per_cell_path, html, latency, args.repeat)
+    source_time, source_data, source_calls = best_of(
+        page_source_path, html, latency, args.repeat)
+
+    if cell_data != source_data:
+        print("Mismatch between per-cell and page_source results!")
+        sys.exit(1)
+
+    print(f"Fixture: {args.fixture} ({len(source_data)} valid rows)")
+    print(f"Simulated WebDriver latency: {args.latency_ms} ms per command")
+    print(f"{'path':<12} {'seconds':>9} {'commands':>9} {'rows/s':>10}")
+    for name, elapsed, calls in [("per-cell", cell_time, cell_calls),
+                                 ("page_source", source_time, source_calls)]:
+        print(f"{name:<12} {elapsed:>9.3f} {calls:>9} {len(source_data) / elapsed:>10.0f}")
+    print(f"Speedup: {cell_time / source_time:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+Offline scraper benchmark: per-phase timings on recorded and generated pages
+
+Usage:
+    python benchmarks/bench_scraper.py [--latency-ms 0] [--repeat 3]
+                                       [--json results.json]
+                                       [--baseline baseline.json --tolerance 0.25]
+
+Pages: the recorded fixture plus generated pages with 1000, 2000 and 5000
+rows, each with a malformed row every 50 rows. The per-cell path runs
+against a fake WebDriver (find_elements / .text), the page_source path
+through the local HTML parser. With --baseline the run exits non-zero
+when any phase is more than --tolerance slower, so CI catches regressions
+without network access.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, ".."))
+# Keep generated players out of the real registry
+os.environ.setdefault("PLAYER_REGISTRY", os.path.join(tempfile.mkdtemp(), "players.csv"))
+
+from fake_webdriver import FakeDriver  # noqa: E402
+from make_fixture import render_page, synthetic_rows  # noqa: E402
+from ranking import extract_player_data, is_properly_formatted_row  # noqa: E402
+from rankings_parser import parse_rankings_html  # noqa: E402
+from snapshots import save_to_csv  # noqa: E402
+
+FIXTURE = os.path.join(HERE, "fixtures", "atp_live_ranking.html")
+PAGE_SIZES = [1000, 2000, 5000]
+MALFORMED_EVERY = 50
+
+
+def load_pages():
+    with open(FIXTURE, encoding="utf-8") as f:
+        pages = {"recorded": f.read()}
+    for n in PAGE_SIZES:
+        pages[f"generated_{n}"] = render_page(synthetic_rows(n), malformed_every=MALFORMED_EVERY)
+    return pages
+
+
+def timed(func, repeat):
+    """
+    Best wall time of repeat runs, plus the result of the last one
+    """
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def bench_page(html, latency, repeat, out_dir):
+    phases = {}
+
+    # Per-cell path: cells are fetched once up front so the validation
+    # phase measures only is_properly_formatted_row
+    driver = FakeDriver(html, latency=latency)
+    rows = driver.find_elements("css selector", "table tbody tr")
+    cells = [row.find_elements("tag name", "td") for row in rows]
+
+    elapsed, valid = timed(lambda: [c for c in cells if is_properly_formatted_row(c)], repeat)
+    phases["is_properly_formatted_row"] = (elapsed, len(cells))
+
+    elapsed, data = timed(
+        lambda: [d for d in (extract_player_data(row) for row in rows) if d], repeat)
+    phases["extract_player_data"] = (elapsed, len(rows))
+
+    elapsed, parsed = timed(lambda: list(parse_rankings_html(html)), repeat)
+    phases["parse_rankings_html"] = (elapsed, len(parsed))
+
+    elapsed, _ = timed(lambda: save_to_csv(iter(parsed), folder=out_dir), repeat)
+    phases["save_to_csv"] = (elapsed, len(parsed))
+
+    if sorted(data, key=lambda x: int(x[0])) != parsed:
+        raise SystemExit("Per-cell and page_source paths disagree!")
+
+    return {
+        phase: {
+            "seconds": round(seconds, 6),
+            "rows": rows_in,
+            "rows_per_second": round(rows_in / seconds) if seconds else None,
+        }
+        for phase, (seconds, rows_in) in phases.items()
+    }
+
+
+def check_regressions(results, baseline, tolerance):
+    failures = []
+    for page, phases in results.items():
+        for phase, stats in phases.items():
+            base = baseline.get(page, {}).get(phase)
+            if base and stats["seconds"] > base["seconds"] * (1 + tolerance):
+                failures.append(
+                    f"{page}/{phase}: {stats['seconds']:.4f}s vs baseline {base['seconds']:.4f}s")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--latency-ms", type=float, default=0.0,
+                        help="simulated WebDriver round trip per command")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--baseline", help="compare against a previous --json result")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    args = parser.parse_args()
+
+    out_dir = tempfile.mkdtemp()
+    results = {}
+    for page, html in load_pages().items():
+        results[page] = bench_page(html, args.latency_ms / 1000, args.repeat, out_dir)
+
+    print(f"\n{'page':<16} {'phase':<26} {'seconds':>9} {'rows':>6} {'rows/s':>10}")
+    for page, phases in results.items():
+        for phase, stats in phases.items():
+            print(f"{page:<16} {phase:<26} {stats['seconds']:>9.4f} "
+                  f"{stats['rows']:>6} {stats['rows_per_second']:>10}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            failures = check_regressions(results, json.load(f), args.tolerance)
+        if failures:
+            print("\nRegressions:")
+            for failure in failures:
+                print(f"  {failure}")
+            sys.exit(1)
+        print(f"\nNo phase slower than baseline by more than {args.tolerance:.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+In-memory stand-in for a Selenium WebDriver serving a saved HTML page
+
+Every find_elements() call and every .text read counts as one WebDriver
+command and can be given an artificial round-trip latency, so the per-cell
+scraping path can be measured without a browser.
+"""
+import time
+
+import lxml.html
+from selenium.common.exceptions import NoSuchElementException
+from selenium.webdriver.common.by import By
+
+from rankings_parser import clean_text
+
+
+class CommandCounter:
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.calls = 0
+
+    def hit(self):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+
+class FakeElement:
+    def __init__(self, element, counter):
+        self._element = element
+        self._counter = counter
+
+    @property
+    def text(self):
+        self._counter.hit()
+        return clean_text(self._element.text_content())
+
+    def find_elements(self, by=By.TAG_NAME, value=None):
+        self._counter.hit()
+        if by != By.TAG_NAME:
+            raise NotImplementedError(f"FakeElement only supports By.TAG_NAME, got {by}")
+        return [FakeElement(e, self._counter) for e in self._element.iterchildren(value)]
+
+
+class FakeDriver:
+    def __init__(self, html, latency=0.0):
+        self._html = html
+        self.current_url = "about:fixture"
+        self.counter = CommandCounter(latency)
+        self._doc = lxml.html.fromstring(html)
+
+    @property
+    def page_source(self):
+        self.counter.hit()
+        return self._html
+
+    def get(self, url):
+        self.counter.hit()
+        self.current_url = url
+
+    def find_elements(self, by=By.CSS_SELECTOR, value=None):
+        self.counter.hit()
+        if by == By.CSS_SELECTOR and value == "table tbody tr":
+            elements = self._doc.xpath("//table//tbody//tr")
+        elif by == By.TAG_NAME:
+            elements = list(self._doc.iter(value))
+        else:
+            raise NotImplementedError(f"FakeDriver does not support {by}={value!r}")
+        return [FakeElement(e, self.counter) for e in elements]
+
+    def find_element(self, by=By.CSS_SELECTOR, value=None):
+        elements = self.find_elements(by, value)
+        if not elements:
+            raise NoSuchElementException(f"No element for {by}={value!r}")
+        return elements[0]
+
+    def quit(self):
+        pass
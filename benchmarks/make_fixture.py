@@ -0,0 +1,100 @@
+"""
+Build a stand-in for a saved live-tennis.eu rankings page from a rankings CSV
+
+Usage: python benchmarks/make_fixture.py [rankings.csv] [output.html]
+"""
+import csv
+import html
+import os
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_SOURCE = os.path.join(HERE, "..", "atp_rankings.csv")
+DEFAULT_OUTPUT = os.path.join(HERE, "fixtures", "atp_live_ranking.html")
+
+
+def render_row(rank, name, age, country, points, change):
+    change_cell = f"<span class='up'>{change}</span>" if change else "-"
+    return (
+        "<tr>"
+        f"<td>{rank}</td>"
+        f"<td class='ch'>{rank}</td>"
+        "<td class='fl'><img src='/flags/x.png' alt=''></td>"
+        f"<td class='pl'><a href='/player/{rank}'>{html.escape(name)}</a></td>"
+        f"<td>{age}</td>"
+        f"<td>{country}</td>"
+        f"<td class='pts'>{points}</td>"
+        f"<td class='mv'>{change_cell}</td>"
+        "<td>-</td><td>0</td><td></td><td>-</td>"
+        "</tr>\n"
+    )
+
+
+# Rows the scraper must reject: bad rank, one-word name, lowercase country,
+# points with text, and a row with too few cells
+MALFORMED_ROWS = [
+    "<tr><td>T1</td><td>1</td><td></td><td>Bad Rank</td><td>25</td><td>ESP</td><td>100</td><td>-</td></tr>\n",
+    "<tr><td>7</td><td>7</td><td></td><td>Mononym</td><td>25</td><td>ESP</td><td>100</td><td>-</td></tr>\n",
+    "<tr><td>7</td><td>7</td><td></td><td>Lower Case</td><td>25</td><td>esp</td><td>100</td><td>-</td></tr>\n",
+    "<tr><td>7</td><td>7</td><td></td><td>Text Points</td><td>25</td><td>ESP</td><td>100 pts</td><td>-</td></tr>\n",
+    "<tr><td>7</td><td>Short Row</td></tr>\n",
+]
+
+
+def synthetic_rows(n):
+    """
+    Plausible ranking rows for pages larger than anything recorded
+    """
+    countries = ["ESP", "FRA", "USA", "ITA", "ARG", "GER", "AUS", "GBR", "SRB", "JPN"]
+    rows = []
+    for i in range(n):
+        rank = i + 1
+        points = max(1, 12000 - rank * 12000 // (n + 1))
+        change = f"+{rank % 7}" if rank % 3 == 0 else ""
+        rows.append([str(rank), f"Player{rank} Surname{rank % 97}", str(18 + rank % 20),
+                     countries[rank % len(countries)], str(points), change])
+    return rows
+
+
+def render_page(rows, malformed_every=0):
+    parts = [
+        "<!DOCTYPE html>\n<html><head><meta charset='utf-8'>"
+        "<title>ATP Live Ranking</title></head><body>\n"
+        "<table class='nav'><tbody><tr><td>Menu</td><td>Live</td></tr></tbody></table>\n"
+        "<table id='u868'><thead><tr><th>#</th><th>CH</th><th></th><th>Player</th>"
+        "<th>Age</th><th>Ctry</th><th>Pts</th><th>+/-</th><th>Tour</th>"
+        "<th>Cur</th><th>Prev</th><th>Next</th></tr></thead><tbody>\n",
+        "<tr><td colspan='12'>Advertisement</td></tr>\n",
+    ]
+    for i, row in enumerate(rows):
+        parts.append(render_row(*row))
+        if malformed_every and i % malformed_every == malformed_every - 1:
+            parts.append(MALFORMED_ROWS[(i // malformed_every) % len(MALFORMED_ROWS)])
+        if i and i % 250 == 0:
+            parts.append("<tr><td colspan='12'>Advertisement</td></tr>\n")
+    parts.append("</tbody></table>\n")
+    # Footer rows after the ranking table, all invalid
+    parts.append("<table class='foot'><tbody>")
+    for _ in range(15):
+        parts.append("<tr><td>About</td><td>Contact</td><td>Privacy</td></tr>")
+    parts.append("</tbody></table>\n</body></html>\n")
+    return "".join(parts)
+
+
+def main():
+    source = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_SOURCE
+    output = sys.argv[2] if len(sys.argv) > 2 else DEFAULT_OUTPUT
+
+    with open(source, newline='', encoding='utf-8') as f:
+        reader = csv.reader(f)
+        next(reader)
+        rows = [row[:6] for row in reader]
+
+    with open(output, "w", encoding="utf-8") as f:
+        f.write(render_page(rows))
+
+    print(f"Wrote {len(rows)} rows to {output}")
+
+
+if __name__ == "__main__":
+    main()
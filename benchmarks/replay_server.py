@@ -0,0 +1,89 @@
+"""
+Local stand-in for live-tennis.eu that serves recorded pages from fixtures/
+
+A request for /en/atp-live-ranking is answered with fixtures/atp_live_ranking.html.
+Responses are gzip-encoded when the client asks for it, carry an ETag and
+Last-Modified derived from the file, answer conditional requests with 304,
+and connections are kept alive.
+
+Usage: python benchmarks/replay_server.py [port]
+then run the scraper with LIVE_TENNIS_BASE_URL=http://127.0.0.1:<port>
+"""
+import email.utils
+import gzip
+import hashlib
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+def fixture_path(url_path):
+    name = url_path.split("?")[0].rstrip("/").split("/")[-1]
+    return os.path.join(FIXTURES, name.replace("-", "_") + ".html")
+
+
+class ReplayHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in separate writes; with Nagle on, a kept-alive
+    # connection waits out the client's delayed ACK (~40 ms) before the body
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        if self.server.delay:
+            time.sleep(self.server.delay)
+        path = self.server.pages.get(self.path.split("?")[0]) or fixture_path(self.path)
+        if not os.path.exists(path):
+            self.send_error(404)
+            return
+
+        with open(path, "rb") as f:
+            body = f.read()
+        etag = '"%s"' % hashlib.sha1(body).hexdigest()
+        last_modified = email.utils.formatdate(os.path.getmtime(path), usegmt=True)
+
+        if (self.headers.get("If-None-Match") == etag
+                or self.headers.get("If-Modified-Since") == last_modified):
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("ETag", etag)
+        self.send_header("Last-Modified", last_modified)
+        if "gzip" in self.headers.get("Accept-Encoding", ""):
+            body = gzip.compress(body)
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_replay_server(port=0, pages=None, delay=0.0):
+    """
+    Start the server on a background thread and return (server, base_url).
+    pages maps URL paths to fixture files, delay adds latency per request.
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", port), ReplayHandler)
+    server.pages = pages or {}
+    server.delay = delay
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+if __name__ == "__main__":
+    server, base_url = start_replay_server(int(sys.argv[1]) if len(sys.argv) > 1 else 8765)
+    print(f"Serving {FIXTURES} at {base_url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,165 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import streamlit as st
+
+from aggregates import compute_aggregates, compute_snapshot_aggregates, read_aggregates
+from delta_store import SnapshotStore, store_version
+from publish import read_published
+from trend_cube import CUBE_FILE, index_file, read_cube
+
+# Built Plotly figures kept for every session, least recently used
+# dropped first. 6 charts x 7 top N options is 42 per published version.
+FIGURE_CACHE_SIZE = int(os.environ.get("FIGURE_CACHE_SIZE", "64"))
+
+# Past snapshots whose aggregates stay in memory for the date selector
+SNAPSHOT_CACHE_SIZE = int(os.environ.get("SNAPSHOT_CACHE_SIZE", "8"))
+
+# Loads (and figures) requested and loads (and figures) built, over every
+# session of this server process; the rest were served from the cache
+_counts = {"calls": 0, "misses": 0, "figure_calls": 0, "figure_misses": 0}
+_stats_lock = threading.Lock()
+
+_figures = OrderedDict()
+
+
+@st.cache_resource(max_entries=4, show_spinner=False)
+def _load_aggregates(path, version):
+    """
+    One shared aggregates dict per published version. Callers must not
+    modify it.
+    """
+    started = time.perf_counter()
+    aggregates = read_aggregates(path)
+    if aggregates is None:
+        # Published without the aggregation stage, compute them here
+        print(f"No precomputed aggregates for {path}, computing them", flush=True)
+        aggregates = compute_aggregates(path)
+    _log_miss(path, version, started)
+    return aggregates
+
+
+@st.cache_resource(max_entries=2, show_spinner=False)
+def _snapshot_store(version):
+    """
+    The snapshot store as of one version of its index
+    """
+    return SnapshotStore("atp_rankings")
+
+
+@st.cache_resource(max_entries=SNAPSHOT_CACHE_SIZE, show_spinner=False)
+def _load_snapshot_aggregates(day, version):
+    """
+    One shared aggregates dict per stored date, rebuilt from its keyframe
+    and deltas. Callers must not modify it.
+    """
+    started = time.perf_counter()
+    aggregates = compute_snapshot_aggregates(_snapshot_store(version).read(day))
+    _log_miss(day, version, started)
+    return aggregates
+
+
+@st.cache_resource(max_entries=1, show_spinner=False)
+def _load_trend_cube(version):
+    """
+    The whole trend cube, shared by every session. Callers must not modify it.
+    """
+    started = time.perf_counter()
+    cube = read_cube()
+    _log_miss(CUBE_FILE, version, started)
+    return cube
+
+
+def _log_miss(path, version, started):
+    with _stats_lock:
+        _counts["misses"] += 1
+    stats = cache_stats()
+    print(f"Data cache miss: loaded {path} ({version}) in "
+          f"{(time.perf_counter() - started) * 1000:.1f} ms, "
+          f"{stats['hits']} hits / {stats['misses']} misses so far", flush=True)
+
+
+def cache_stats():
+    with _stats_lock:
+        return {
+            "hits": _counts["calls"] - _counts["misses"],
+            "misses": _counts["misses"],
+            "figure_hits": _counts["figure_calls"] - _counts["figure_misses"],
+            "figure_misses": _counts["figure_misses"],
+        }
+
+
+def cached_figure(snapshot, top_n, chart_id, build):
+    """
+    The figure for (snapshot hash, top N, chart id), from build() on a miss.
+
+    Figures are shared by every session, so callers must not modify them.
+    st.plotly_chart() only serializes what it's given.
+    """
+    key = (snapshot, top_n, chart_id)
+    with _stats_lock:
+        _counts["figure_calls"] += 1
+        if key in _figures:
+            _figures.move_to_end(key)
+            return _figures[key]
+
+    # Two sessions missing at once both build it, the last one is kept
+    fig = build()
+    with _stats_lock:
+        _counts["figure_misses"] += 1
+        _figures[key] = fig
+        while len(_figures) > FIGURE_CACHE_SIZE:
+            _figures.popitem(last=False)
+    return fig
+
+
+def load_dashboard_aggregates():
+    """
+    (aggregates.build_aggregates() of the live rankings, last update date).
+
+    The cache key is the published file plus its mtime: a new publish
+    points at a new file (or bumps the mtime of atp_rankings.csv), so the
+    next rerun misses once and every session after that shares the result.
+    """
+    path, last_updated, version = _published_version()
+    return _load_aggregates(path, version), last_updated
+
+
+def snapshot_dates():
+    """
+    Every date in the snapshot store, oldest first, from its index alone
+    """
+    return _snapshot_store(store_version()).dates()
+
+
+def load_snapshot_aggregates(day):
+    """
+    Aggregates of the stored snapshot of day (YYYY-MM-DD), cached like
+    load_dashboard_aggregates() but for the SNAPSHOT_CACHE_SIZE dates
+    viewed most recently
+    """
+    version = store_version()
+    with _stats_lock:
+        _counts["calls"] += 1
+    return _load_snapshot_aggregates(day, version)
+
+
+def load_trend_cube():
+    """
+    (trend cube, version), reread only after a publish appends to it
+    """
+    # The index is rewritten last, once the appended rows are complete
+    index = index_file(CUBE_FILE)
+    version = os.stat(index if os.path.exists(index) else CUBE_FILE).st_mtime_ns
+    with _stats_lock:
+        _counts["calls"] += 1
+    return _load_trend_cube(version), version
+
+
+def _published_version():
+    path, last_updated = read_published()
+    with _stats_lock:
+        _counts["calls"] += 1
+    return path, last_updated, os.stat(path).st_mtime_ns
@@ -0,0 +1,341 @@
+"""
+Snapshot store with periodic keyframes and per-day deltas keyed by player
+
+Layout: history/snapshots/<prefix>/
+    index.json                  every stored date, its kind and its base date
+    YYYY-MM-DD.keyframe.csv     a full snapshot, same format as save_to_csv()
+    YYYY-MM-DD.delta.json       only what changed since the base date
+
+Usage:
+    python delta_store.py add atp_rankings_data/*.csv
+    python delta_store.py show 2025-03-10 [--source atp_rankings]
+    python delta_store.py stats [--source atp_rankings]
+"""
+import argparse
+import bisect
+import csv
+import json
+import os
+import sys
+from datetime import date
+
+from publish import atomic_path
+from snapshots import SNAPSHOT_HEADER, parse_snapshot_name, read_rows, snapshot_identity
+
+STORE_DIR = os.environ.get("SNAPSHOT_STORE_DIR", os.path.join("history", "snapshots"))
+
+# Longest run of deltas before the next keyframe, so rebuilding any date
+# reads one keyframe and at most this many small deltas
+KEYFRAME_EVERY = int(os.environ.get("KEYFRAME_EVERY", "7"))
+
+# Days when most of the table moves (official ranking release) are cheaper
+# stored whole
+MAX_DELTA_RATIO = 0.5
+
+RANK, NAME, AGE, COUNTRY, POINTS, CHANGE, PLAYER_ID = range(len(SNAPSHOT_HEADER))
+
+
+def row_width(rows):
+    # Snapshots from before player IDs have one column less
+    return len(rows[0]) if rows else len(SNAPSHOT_HEADER)
+
+
+def predicted_row(old, name, rank, width=len(SNAPSHOT_HEADER)):
+    """
+    What a player's row looks like if nothing but their rank moved.
+
+    Change is the gap to the official ranking, which only moves once a
+    week, so it follows the live rank: official = old rank + old change.
+    """
+    if old is None:
+        return [rank, name] + [""] * (width - 2)
+
+    change = ""
+    if old[CHANGE] and old[RANK].isdigit() and rank.isdigit():
+        gap = int(old[RANK]) + int(old[CHANGE]) - int(rank)
+        change = f"{gap:+d}" if gap else ""
+    row = [rank, name, old[AGE], old[COUNTRY], old[POINTS], change] + old[PLAYER_ID:]
+    return (row + [""] * width)[:width]
+
+
+def stable_players(names, previous_index):
+    """
+    Longest run of players (in names order) whose previous positions are
+    still increasing, i.e. who kept their order relative to each other
+    """
+    tails = []
+    tail_positions = []
+    links = [None] * len(names)
+
+    for i, name in enumerate(names):
+        old = previous_index.get(name)
+        if old is None:
+            continue
+        k = bisect.bisect_left(tails, old)
+        links[i] = tail_positions[k - 1] if k else None
+        if k == len(tails):
+            tails.append(old)
+            tail_positions.append(i)
+        else:
+            tails[k] = old
+            tail_positions[k] = i
+
+    stable = set()
+    i = tail_positions[-1] if tail_positions else None
+    while i is not None:
+        stable.add(names[i])
+        i = links[i]
+    return stable
+
+
+def encode_delta(previous_rows, rows):
+    """
+    Describe rows as changes to previous_rows, or None if they can't be
+    keyed by player (duplicate names)
+    """
+    previous_names = [row[NAME] for row in previous_rows]
+    names = [row[NAME] for row in rows]
+    if len(set(previous_names)) != len(previous_names) or len(set(names)) != len(names):
+        return None
+
+    previous = dict(zip(previous_names, previous_rows))
+    width = row_width(rows)
+    current = set(names)
+    previous_index = {name: i for i, name in enumerate(n for n in previous_names if n in current)}
+    stable = stable_players(names, previous_index)
+
+    changes = {}
+    for position, row in enumerate(rows, 1):
+        name = row[NAME]
+        changed = {}
+        if row[RANK] != str(position):
+            changed["Rank"] = row[RANK]
+        expected = predicted_row(previous.get(name), name, row[RANK], width)
+        for column, (value, guess) in enumerate(zip(row, expected)):
+            if column != RANK and value != guess:
+                changed[SNAPSHOT_HEADER[column]] = value
+        if changed:
+            changes[name] = changed
+
+    return {
+        "removed": [name for name in previous_names if name not in current],
+        "placed": [[name, i] for i, name in enumerate(names) if name not in stable],
+        "changes": changes,
+        "width": width,
+    }
+
+
+def apply_delta(previous_rows, delta):
+    previous = {row[NAME]: row for row in previous_rows}
+    removed = set(delta["removed"])
+    placed = dict(delta["placed"])
+
+    # Players who kept their relative order stay put, the rest are
+    # inserted at their final positions
+    names = [row[NAME] for row in previous_rows if row[NAME] not in removed and row[NAME] not in placed]
+    for name, i in sorted(placed.items(), key=lambda item: item[1]):
+        names.insert(i, name)
+
+    width = delta.get("width", row_width(previous_rows))
+    rows = []
+    for position, name in enumerate(names, 1):
+        changed = delta["changes"].get(name, {})
+        row = predicted_row(previous.get(name), name, changed.get("Rank", str(position)), width)
+        for column, value in changed.items():
+            row[SNAPSHOT_HEADER.index(column)] = value
+        rows.append(row)
+    return rows
+
+
+class SnapshotStore:
+    """
+    Keyframes plus deltas for one snapshot prefix (atp_rankings, atp_race...)
+    """
+
+    def __init__(self, source="atp_rankings", store_dir=STORE_DIR):
+        self.source = source
+        self.folder = os.path.join(store_dir, source)
+        self.index_file = os.path.join(self.folder, "index.json")
+        if os.path.exists(self.index_file):
+            with open(self.index_file, encoding="utf-8") as f:
+                self.index = json.load(f)
+        else:
+            self.index = {}
+
+    def dates(self):
+        return sorted(self.index)
+
+    def _path(self, day, kind):
+        return os.path.join(self.folder, f"{day}.{kind}." + ("csv" if kind == "keyframe" else "json"))
+
+    def _write(self, path, write):
+        with atomic_path(path) as tmp_path:
+            with open(tmp_path, "w", newline="", encoding="utf-8") as f:
+                write(f)
+
+    def _write_keyframe(self, day, rows):
+        def write(f):
+            writer = csv.writer(f)
+            writer.writerow(SNAPSHOT_HEADER[:row_width(rows)])
+            writer.writerows(rows)
+
+        self._write(self._path(day, "keyframe"), write)
+
+    def _save_index(self):
+        self._write(self.index_file, lambda f: json.dump(self.index, f, indent=1, sort_keys=True))
+
+    def _remove_files(self, day):
+        for kind in ("keyframe", "delta"):
+            if os.path.exists(self._path(day, kind)):
+                os.remove(self._path(day, kind))
+
+    def read(self, day):
+        """
+        Rebuild the snapshot for one date: its keyframe plus at most
+        KEYFRAME_EVERY deltas, however long the history is
+        """
+        day = str(day)
+        if day not in self.index:
+            raise KeyError(f"No {self.source} snapshot for {day}")
+
+        chain = []
+        while self.index[day]["kind"] == "delta":
+            chain.append(day)
+            day = self.index[day]["base"]
+
+        rows = read_rows(self._path(day, "keyframe"))
+        for day in reversed(chain):
+            with open(self._path(day, "delta"), encoding="utf-8") as f:
+                rows = apply_delta(rows, json.load(f))
+        return rows
+
+    def iter_range(self, start=None, end=None):
+        """
+        Yield (date, rows) for every stored date in [start, end], applying
+        each delta once on top of the previous date rather than rebuilding
+        every date from its keyframe
+        """
+        rows_by_day = {}
+        for day in self.dates():
+            if (start and day < str(start)) or (end and day > str(end)):
+                continue
+            entry = self.index[day]
+            if entry["kind"] == "delta" and entry["base"] in rows_by_day:
+                with open(self._path(day, "delta"), encoding="utf-8") as f:
+                    rows = apply_delta(rows_by_day[entry["base"]], json.load(f))
+            else:
+                rows = self.read(day)
+            # Only the latest date can be the base of the next one
+            rows_by_day = {day: rows}
+            yield date.fromisoformat(day), rows
+
+    def add(self, day, rows):
+        """
+        Store one snapshot, as a delta on the latest earlier date when that
+        is small enough and the chain is short enough, else as a keyframe.
+        Re-adding a date replaces it.
+        """
+        day = str(day)
+        os.makedirs(self.folder, exist_ok=True)
+
+        if day in self.index:
+            # Dates built on top of this one become keyframes first
+            for other in self.dates():
+                if self.index[other].get("base") == day:
+                    rows_other = self.read(other)
+                    self._remove_files(other)
+                    self._write_keyframe(other, rows_other)
+                    self.index[other] = {"kind": "keyframe", "depth": 0, "rows": len(rows_other)}
+            self._remove_files(day)
+            del self.index[day]
+
+        earlier = [other for other in self.dates() if other < day]
+        entry = {"kind": "keyframe", "depth": 0, "rows": len(rows)}
+        if earlier and self.index[earlier[-1]]["depth"] < KEYFRAME_EVERY:
+            base = earlier[-1]
+            delta = encode_delta(self.read(base), rows)
+            if delta is not None and apply_delta(self.read(base), delta) == rows:
+                encoded = json.dumps(delta, separators=(",", ":"), ensure_ascii=False)
+                changed = len(delta["placed"]) + len(delta["changes"]) + len(delta["removed"])
+                if changed <= MAX_DELTA_RATIO * max(len(rows), 1):
+                    self._write(self._path(day, "delta"), lambda f: f.write(encoded + "\n"))
+                    entry = {"kind": "delta", "base": base,
+                             "depth": self.index[base]["depth"] + 1, "rows": len(rows)}
+
+        if entry["kind"] == "keyframe":
+            self._write_keyframe(day, rows)
+        self.index[day] = entry
+        self._save_index()
+        return entry["kind"]
+
+    def stats(self):
+        """
+        Number of files and bytes on disk, per kind
+        """
+        counts = {"keyframe": 0, "delta": 0}
+        sizes = {"keyframe": 0, "delta": 0}
+        for day, entry in self.index.items():
+            counts[entry["kind"]] += 1
+            sizes[entry["kind"]] += os.path.getsize(self._path(day, entry["kind"]))
+        return counts, sizes
+
+
+def add_snapshot(csv_path, snapshot_date=None, source=None, store_dir=STORE_DIR):
+    """
+    Add one save_to_csv() output to the store, returns "keyframe" or "delta"
+    """
+    source, snapshot_date = snapshot_identity(csv_path, source, snapshot_date)
+    # Columns past the header (movement) are derived, don't store them
+    rows = [row[:len(SNAPSHOT_HEADER)] for row in read_rows(csv_path)]
+    return SnapshotStore(source, store_dir).add(snapshot_date, rows)
+
+
+def read_snapshot(day, source="atp_rankings", store_dir=STORE_DIR):
+    return SnapshotStore(source, store_dir).read(day)
+
+
+def store_version(source="atp_rankings", store_dir=STORE_DIR):
+    """
+    The mtime of the store's index, 0 while it's empty. Cache keys use it:
+    adding a date rewrites the index, which may also replace a date.
+    """
+    index_file = os.path.join(store_dir, source, "index.json")
+    return os.stat(index_file).st_mtime_ns if os.path.exists(index_file) else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Keyframe + delta store of ranking snapshots")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    add = commands.add_parser("add", help="store snapshot CSVs, oldest first")
+    add.add_argument("files", nargs="+")
+
+    show = commands.add_parser("show", help="print one date as CSV")
+    show.add_argument("date")
+    show.add_argument("--source", default="atp_rankings")
+
+    stats = commands.add_parser("stats", help="files and bytes in the store")
+    stats.add_argument("--source", default="atp_rankings")
+
+    args = parser.parse_args()
+
+    if args.command == "add":
+        # Deltas are taken against the previous date, so go in date order
+        for path in sorted(args.files, key=lambda p: parse_snapshot_name(p)[1] or date.min):
+            try:
+                print(f"{path}: stored as {add_snapshot(path)}")
+            except ValueError as e:
+                print(f"Skipping {path}: {e}", file=sys.stderr)
+    elif args.command == "show":
+        rows = read_snapshot(args.date, args.source)
+        writer = csv.writer(sys.stdout)
+        writer.writerow(SNAPSHOT_HEADER[:row_width(rows)])
+        writer.writerows(rows)
+    else:
+        counts, sizes = SnapshotStore(args.source).stats()
+        for kind in counts:
+            print(f"{kind}s: {counts[kind]} files, {sizes[kind]} bytes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+import atexit
+import os
+
+from selenium import webdriver
+from selenium.webdriver.chrome.service import Service
+
+import metrics
+
+
+def attach_driver(debugger_address, chromedriver_path=None):
+    """
+    Attach to an already-running Chrome started with --remote-debugging-port
+    """
+    options = webdriver.ChromeOptions()
+    options.debugger_address = debugger_address
+    service = Service(executable_path=chromedriver_path) if chromedriver_path else Service()
+    return webdriver.Chrome(service=service, options=options)
+
+
+class DriverManager:
+    """
+    Keep one warm Chrome alive across retry attempts and scheduled runs.
+
+    The browser is launched (or attached to over CHROME_DEBUGGER_ADDRESS)
+    on first use, health-checked before every reuse and recycled after
+    max_uses scrapes so a leaking page can't grow forever.
+    """
+
+    def __init__(self, launch, max_uses=None, debugger_address=None, chromedriver_path=None):
+        self.launch = launch
+        self.max_uses = max_uses or int(os.environ.get("DRIVER_MAX_USES", "20"))
+        self.debugger_address = debugger_address or os.environ.get("CHROME_DEBUGGER_ADDRESS")
+        self.chromedriver_path = chromedriver_path
+        self.driver = None
+        self.uses = 0
+        atexit.register(self.close)
+
+    def acquire(self):
+        if self.driver is not None:
+            if self.uses >= self.max_uses:
+                print(f"Recycling Chrome after {self.uses} uses", flush=True)
+                self.close()
+            elif not self.is_healthy():
+                print("Chrome failed health check, restarting", flush=True)
+                self.close()
+
+        if self.driver is None:
+            self.driver = self._start()
+            self.uses = 0
+        else:
+            print(f"Reusing warm Chrome (use {self.uses + 1} of {self.max_uses})", flush=True)
+
+        self.uses += 1
+        return self.driver
+
+    def is_healthy(self):
+        try:
+            self.driver.execute_script("return 1")
+            return True
+        except Exception:
+            return False
+
+    def discard(self):
+        """
+        Drop the current browser after a failed scrape so the next attempt starts clean
+        """
+        self.close()
+
+    def close(self):
+        if self.driver is None:
+            return
+        try:
+            # For an attached browser this only ends the chromedriver session
+            self.driver.quit()
+        except Exception as e:
+            print(f"Error closing Chrome: {e}", flush=True)
+        self.driver = None
+
+    def _start(self):
+        with metrics.span("setup_driver"):
+            if self.debugger_address:
+                try:
+                    print(f"Attaching to Chrome at {self.debugger_address}...", flush=True)
+                    return attach_driver(self.debugger_address, self.chromedriver_path)
+                except Exception as e:
+                    print(f"Could not attach to Chrome: {e}", flush=True)
+
+            print("Launching Chrome...", flush=True)
+            return self.launch()
@@ -0,0 +1,175 @@
+"""
+Indexed SQLite history of ranking snapshots, one database per prefix
+
+Usage:
+    python history_db.py load [FILES...]       bulk-load snapshot CSVs (default: atp_rankings_data/*.csv)
+    python history_db.py rebuild               reload every date from history/snapshots
+    python history_db.py player "Jannik Sinner" [--start 2025-01-01] [--end 2025-12-31]
+    python history_db.py top 2025-03-10 [--n 10]
+"""
+import argparse
+import glob
+import os
+import sqlite3
+import sys
+import time
+
+from delta_store import SnapshotStore
+from player_registry import get_registry, snapshot_player_ids
+from snapshots import parse_snapshot_name, read_rows, snapshot_identity
+
+DB_DIR = os.environ.get("HISTORY_DB_DIR", "history")
+
+SCHEMA = """
+-- id is the player_registry ID, the same one snapshots carry
+CREATE TABLE IF NOT EXISTS players (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL
+);
+
+-- The primary key doubles as the (player_id, date) covering index:
+-- WITHOUT ROWID stores the rows themselves in that order
+CREATE TABLE IF NOT EXISTS rankings (
+    player_id INTEGER NOT NULL REFERENCES players(id),
+    date TEXT NOT NULL,
+    rank INTEGER NOT NULL,
+    points INTEGER NOT NULL,
+    age INTEGER,
+    country TEXT,
+    PRIMARY KEY (player_id, date)
+) WITHOUT ROWID;
+
+-- Top N on a date is answered from this index alone
+CREATE INDEX IF NOT EXISTS rankings_by_date ON rankings (date, rank, player_id, points);
+"""
+
+
+def connect(source="atp_rankings", db_dir=DB_DIR):
+    os.makedirs(db_dir, exist_ok=True)
+    conn = sqlite3.connect(os.path.join(db_dir, f"{source}.sqlite"))
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def player_ids(conn, rows):
+    """
+    {name: registry ID} for every player in rows, taken from the Player ID
+    column or, for older snapshots without it, from the registry
+    """
+    names = [row[1] for row in rows]
+    ids = dict(zip(names, snapshot_player_ids(names, [row[6] if len(row) > 6 else None for row in rows])))
+    registry = get_registry()
+    conn.executemany("INSERT OR IGNORE INTO players (id, name) VALUES (?, ?)",
+                     ((player_id, registry.names.get(player_id, name)) for name, player_id in ids.items()))
+    return ids
+
+
+def load_rows(conn, day, rows):
+    """
+    Replace one date's rankings with rows (snapshot CSV rows)
+    """
+    ids = player_ids(conn, rows)
+    conn.execute("DELETE FROM rankings WHERE date = ?", (str(day),))
+    conn.executemany(
+        "INSERT OR REPLACE INTO rankings (player_id, date, rank, points, age, country) "
+        "VALUES (?, ?, ?, ?, ?, ?)",
+        ((ids[row[1]], str(day), int(row[0]), int(row[4].replace(",", "")),
+          int(row[2]) if row[2].isdigit() else None, row[3])
+         for row in rows))
+
+
+def load_snapshot(csv_path, snapshot_date=None, source=None, db_dir=DB_DIR):
+    """
+    Add one save_to_csv() output to its prefix's database
+    """
+    source, snapshot_date = snapshot_identity(csv_path, source, snapshot_date)
+
+    conn = connect(source, db_dir)
+    try:
+        with conn:
+            load_rows(conn, snapshot_date, read_rows(csv_path))
+    finally:
+        conn.close()
+
+
+def player_history(conn, name, start=None, end=None):
+    """
+    [(date, rank, points)] for one player, oldest first. Any spelling the
+    registry folds to the same player works.
+    """
+    player_id = get_registry().lookup(name)
+    if player_id is None:
+        return []
+    return conn.execute(
+        "SELECT date, rank, points FROM rankings "
+        "WHERE player_id = ? AND date >= ? AND date <= ? ORDER BY date",
+        (player_id, str(start or "0000-00-00"), str(end or "9999-99-99"))).fetchall()
+
+
+def top_on_date(conn, day, n=10):
+    """
+    [(rank, name, points)] for the best n players on a date
+    """
+    return conn.execute(
+        "SELECT r.rank, p.name, r.points FROM rankings r "
+        "JOIN players p ON p.id = r.player_id "
+        "WHERE r.date = ? AND r.rank <= ? ORDER BY r.rank",
+        (str(day), n)).fetchall()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SQLite history of ranking snapshots")
+    parser.add_argument("--source", default="atp_rankings")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    load = commands.add_parser("load", help="bulk-load snapshot CSVs")
+    load.add_argument("files", nargs="*")
+
+    commands.add_parser("rebuild", help="reload every date kept in the snapshot store")
+
+    player = commands.add_parser("player", help="one player's rank over time")
+    player.add_argument("name")
+    player.add_argument("--start")
+    player.add_argument("--end")
+
+    top = commands.add_parser("top", help="top N players on a date")
+    top.add_argument("date")
+    top.add_argument("--n", type=int, default=10)
+
+    args = parser.parse_args()
+    conn = connect(args.source)
+    started = time.perf_counter()
+
+    if args.command == "load":
+        files = args.files or sorted(glob.glob(f"atp_rankings_data/{args.source}_*.csv"))
+        # One transaction for the whole backlog
+        with conn:
+            for path in files:
+                prefix, day = parse_snapshot_name(path)
+                if day is None or prefix != args.source:
+                    print(f"Skipping {path}: not a {args.source} snapshot", file=sys.stderr)
+                    continue
+                load_rows(conn, day, read_rows(path))
+        print(f"Loaded {len(files)} files")
+    elif args.command == "rebuild":
+        days = 0
+        with conn:
+            for day, rows in SnapshotStore(args.source).iter_range():
+                load_rows(conn, day, rows)
+                days += 1
+        print(f"Loaded {days} dates from the snapshot store")
+    elif args.command == "player":
+        for row in player_history(conn, args.name, args.start, args.end):
+            print(*row, sep="\t")
+    else:
+        for row in top_on_date(conn, args.date, args.n):
+            print(*row, sep="\t")
+
+    conn.close()
+    print(f"({(time.perf_counter() - started) * 1000:.1f} ms)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
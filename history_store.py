@@ -0,0 +1,163 @@
+"""
+Date-partitioned Parquet history of every ranking snapshot
+
+Layout: history/parquet/source=<prefix>/date=<YYYY-MM-DD>/part-0.parquet
+
+Usage:
+    python history_store.py ingest atp_rankings_data/*.csv
+    python history_store.py rebuild [--source atp_rankings]
+    python history_store.py query --start 2025-03-01 --end 2025-03-31 --columns Rank Points
+
+The partitions are not committed, history/snapshots/ carries the history
+in git and rebuild writes every stored date back out.
+"""
+import argparse
+import io
+import os
+import sys
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from aggregates import snapshot_csv
+from delta_store import SnapshotStore
+from player_registry import snapshot_player_ids
+from publish import atomic_path
+from rankings_data import load_rankings
+from snapshots import snapshot_identity
+
+HISTORY_DIR = os.environ.get("HISTORY_DIR", os.path.join("history", "parquet"))
+
+SNAPSHOT_SCHEMA = pa.schema([
+    ("Rank", pa.int16()),
+    ("Player Name", pa.string()),
+    ("Age", pa.int16()),
+    ("Country", pa.dictionary(pa.int16(), pa.string())),
+    ("Points", pa.int32()),
+    ("Change", pa.int16()),
+    ("Player ID", pa.int32()),
+    ("Rank Delta", pa.int16()),
+    ("Points Delta", pa.int32()),
+    ("Rank Delta Monday", pa.int16()),
+    ("Points Delta Monday", pa.int32()),
+    ("Rank Delta 52W", pa.int16()),
+    ("Points Delta 52W", pa.int32()),
+])
+
+PARTITIONING = ds.partitioning(
+    pa.schema([("source", pa.string()), ("date", pa.date32())]), flavor="hive")
+
+
+def read_snapshot_table(csv_path):
+    """
+    Read a snapshot CSV (a path or file object) into an Arrow table with
+    typed columns
+    """
+    df = load_rankings(csv_path)
+    df["Player ID"] = snapshot_player_ids(df["Player Name"], df.get("Player ID"))
+    # Movement columns are null for snapshots that never had them
+    df = df.reindex(columns=SNAPSHOT_SCHEMA.names)
+    return pa.Table.from_pandas(df, schema=SNAPSHOT_SCHEMA, preserve_index=False)
+
+
+def ingest_snapshot(csv_path, snapshot_date=None, source=None, history_dir=HISTORY_DIR):
+    """
+    Write one snapshot into its date partition. Re-ingesting a date replaces it.
+    """
+    source, snapshot_date = snapshot_identity(csv_path, source, snapshot_date)
+    return write_partition(read_snapshot_table(csv_path), source, snapshot_date.isoformat(), history_dir)
+
+
+def write_partition(table, source, day, history_dir=HISTORY_DIR):
+    partition = os.path.join(history_dir, f"source={source}", f"date={day}")
+    os.makedirs(partition, exist_ok=True)
+
+    path = os.path.join(partition, "part-0.parquet")
+    with atomic_path(path) as tmp_path:
+        pq.write_table(table, tmp_path, compression="zstd")
+    return path
+
+
+def rebuild_history(source="atp_rankings", history_dir=HISTORY_DIR):
+    """
+    Write the partition of every date in the snapshot store, returns the
+    number of dates written
+    """
+    days = 0
+    for day, rows in SnapshotStore(source).iter_range():
+        table = read_snapshot_table(io.StringIO(snapshot_csv(rows)))
+        write_partition(table, source, day, history_dir)
+        days += 1
+    return days
+
+
+def history_dataset(history_dir=HISTORY_DIR):
+    schema = SNAPSHOT_SCHEMA
+    for field in PARTITIONING.schema:
+        schema = schema.append(field)
+    return ds.dataset(history_dir, schema=schema, format="parquet", partitioning=PARTITIONING,
+                      exclude_invalid_files=True)
+
+
+def read_history(start=None, end=None, columns=None, source="atp_rankings", filter=None,
+                 history_dir=HISTORY_DIR):
+    """
+    Load a date range of snapshots as one DataFrame.
+
+    The date/source bounds prune whole partitions and filter (a
+    pyarrow.dataset expression, e.g. ds.field("Rank") <= 100) is pushed
+    down to the Parquet row groups, so only the matching data is read.
+    """
+    if not os.path.exists(history_dir):
+        return pd.DataFrame(columns=(columns or SNAPSHOT_SCHEMA.names) + ["date"])
+
+    expression = ds.field("source") == source
+    if start is not None:
+        expression &= ds.field("date") >= pa.scalar(pd.Timestamp(start).date(), pa.date32())
+    if end is not None:
+        expression &= ds.field("date") <= pa.scalar(pd.Timestamp(end).date(), pa.date32())
+    if filter is not None:
+        expression &= filter
+
+    if columns is not None:
+        columns = list(columns) + ["date"]
+    table = history_dataset(history_dir).to_table(columns=columns, filter=expression)
+    return table.to_pandas()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parquet history of ranking snapshots")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    ingest = commands.add_parser("ingest", help="add snapshot CSVs to the history")
+    ingest.add_argument("files", nargs="+")
+
+    rebuild = commands.add_parser("rebuild", help="rewrite every date kept in the snapshot store")
+    rebuild.add_argument("--source", default="atp_rankings")
+
+    query = commands.add_parser("query", help="print a slice of the history")
+    query.add_argument("--start")
+    query.add_argument("--end")
+    query.add_argument("--source", default="atp_rankings")
+    query.add_argument("--columns", nargs="+")
+    query.add_argument("--top", type=int, help="only ranks up to this number")
+
+    args = parser.parse_args()
+
+    if args.command == "ingest":
+        for path in args.files:
+            try:
+                print(f"{path} -> {ingest_snapshot(path)}")
+            except ValueError as e:
+                print(f"Skipping {path}: {e}", file=sys.stderr)
+    elif args.command == "rebuild":
+        print(f"Wrote {rebuild_history(args.source)} dates from the snapshot store")
+    else:
+        expression = ds.field("Rank") <= args.top if args.top else None
+        print(read_history(args.start, args.end, args.columns, args.source, expression).to_string())
+
+
+if __name__ == "__main__":
+    main()
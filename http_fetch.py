@@ -0,0 +1,82 @@
+import os
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import metrics
+from scrape_state import RankingsUnchanged, check_table_hash, conditional_headers
+
+# Point this at a local replay server to run the scraper offline
+BASE_URL = os.environ.get("LIVE_TENNIS_BASE_URL", "https://live-tennis.eu")
+RANKINGS_PATH = "/en/atp-live-ranking"
+
+USER_AGENT = "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/134.0.0.0 Safari/537.36"
+
+_session = None
+
+
+def rankings_url(path=RANKINGS_PATH):
+    return BASE_URL.rstrip("/") + path
+
+
+def get_session():
+    """
+    Return the shared requests Session so connections are kept alive and reused
+    """
+    global _session
+    if _session is None:
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=8)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        session.headers.update({
+            "User-Agent": USER_AGENT,
+            "Accept": "text/html,application/xhtml+xml;q=0.9,*/*;q=0.8",
+            "Accept-Encoding": "gzip, deflate",
+            "Accept-Language": "en-US,en;q=0.9",
+            "Connection": "keep-alive",
+        })
+        _session = session
+    return _session
+
+
+def fetch_page(url, timeout=15, headers=None):
+    response = get_session().get(url, timeout=timeout, headers=headers)
+    response.raise_for_status()
+    return response
+
+
+def fetch_rankings_html(url=None, state=None):
+    """
+    Fetch the rankings page over plain HTTP.
+
+    Returns (html, new_state) where new_state holds the validators to
+    remember once the page has been parsed and saved, or None if the
+    request failed. Raises RankingsUnchanged when the ETag/Last-Modified
+    validators or the table hash in state show nothing has changed; in
+    the table hash case the response's validators are merged into state.
+    """
+    url = url or rankings_url()
+    state = state if state is not None else {}
+    try:
+        with metrics.span("http_fetch"):
+            response = fetch_page(url, headers=conditional_headers(state))
+    except requests.RequestException as e:
+        print(f"HTTP fetch failed: {e}", flush=True)
+        return None
+
+    if response.status_code == 304:
+        raise RankingsUnchanged("source returned 304 Not Modified")
+
+    html = response.text
+    validators = {
+        "etag": response.headers.get("ETag"),
+        "last_modified": response.headers.get("Last-Modified"),
+    }
+    try:
+        html_hash = check_table_hash(state, html)
+    except RankingsUnchanged:
+        # Same table behind new validators: keep them so the next request gets a 304
+        state.update(validators)
+        raise
+    return html, {**validators, "table_hash": html_hash}
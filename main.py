@@ -1,11 +1,14 @@
 import streamlit as st
 import pandas as pd
 import plotly.graph_objects as go
-import numpy as np
-import os
 import shutil
 from datetime import datetime
 
+from aggregates import TOP_N_OPTIONS
+from dashboard_data import (cache_stats, cached_figure, load_dashboard_aggregates, load_snapshot_aggregates,
+                            load_trend_cube, snapshot_dates)
+from trend_cube import country_trend, mean_age_trend
+
 st.set_page_config(
     page_title="ATP Stats",  # Title of your app
     page_icon="🎾",  # Icon for the page
@@ -13,91 +16,28 @@ st.set_page_config(
     initial_sidebar_state="collapsed"  # Sidebar collapsed by default
 )
 
-# Load Data
-df = pd.read_csv("atp_rankings.csv")
-
-# Read the last real update date
-if os.path.exists("last_updated.txt"):
-    with open("last_updated.txt", "r") as f:
-        last_modified_date = f.read().strip()
-else:
-    last_modified_date = "Unknown"
-
-# Format for display
-st.markdown(f"**Last Update:** {last_modified_date}")
-
-# Make sure data is sorted by rank
-df = df.sort_values(by="Rank")
-
-# Add buttons for selecting top N players (horizontal layout)
-st.markdown("### Top ATP Stats country and age")
-top_n = st.radio(
-    "Select top N players",
-    options=[10, 20, 50, 100, 200, 500, 1000],
-    index=2,  # Default to top 1000
-    horizontal=True
-)
-
-# Filter the data to show the top N players BY RANK
-df_top_n = df.head(top_n)
-
-# Generate the count of players by country
-country_counts = df_top_n["Country"].value_counts().reset_index()
-country_counts.columns = ["Country", "Number of Players"]
-
-# Get top 10 countries
-country_counts_top = country_counts.head(10)
-
-# Country to flag code mapping - add more as needed
-flag_codes = {
-    "USA": "us", "ESP": "es", "FRA": "fr", "GBR": "gb", "ITA": "it",
-    "ARG": "ar", "AUS": "au", "GER": "de", "SUI": "ch", "CAN": "ca", "JPN": "jp", "CZE": "cz", "SRB": "rs", "AUT": "at",
-    "NED": "nl", "POL": "pl", "CRO": "hr", "BRA": "br", "RSA": "za",
-    "BEL": "be", "POR": "pt", "SWE": "se", "NOR": "no", "GRE": "gr", "CHN": "cn", "CHI": "cn"
-}
-
-# Create the figure
-fig = go.Figure()
-
-# Add bars
-fig.add_trace(go.Bar(
-    x=country_counts_top["Country"],
-    y=country_counts_top["Number of Players"],
-    hovertext=[f"{row['Country']}: {row['Number of Players']} players" for _,
-               row in country_counts_top.iterrows()],
-    marker=dict(color='rgb(52, 152, 219)', line=dict(
-        color='rgb(8, 48, 107)', width=1)),
-    text=country_counts_top["Number of Players"],
-    textposition='inside',
-    # Change text color to white and bold
-    textfont=dict(color="white", size=14, family="Arial Black")
-))
-
-# Update layout
-fig.update_layout(
-    title=f"Top 10 Countries by Player Count (from Top {top_n} Players by Rank)",
-    yaxis=dict(
-        title="Number of Players",
-        range=[0, max(country_counts_top["Number of Players"]) * 1.1]
-    ),
-    xaxis=dict(
-        tickangle=-45,
-    ),
-    bargap=0.2,
-    margin=dict(l=40, r=40, b=50, t=80),
-    showlegend=False,
-    template="plotly_white",
-    height=400,
+# Any stored past snapshot can be viewed instead of the live rankings
+rankings_date = st.selectbox(
+    "Rankings date",
+    options=["Latest"] + snapshot_dates()[::-1],
+    index=0,
 )
 
-# Fix the gap between y-axis and first bar
-fig.update_xaxes(
-    range=[-0.5, len(country_counts_top)-0.5],
-    constrain="domain"
-)
+if rankings_date == "Latest":
+    # Load Data: the published file and its update date come from one pointer,
+    # so a scrape publishing mid-read can't mix old and new. Everything below
+    # renders from the aggregates precomputed for that file at publish time
+    aggregates, last_modified_date = load_dashboard_aggregates()
 
-# Display the chart
-st.plotly_chart(fig)
+    # Format for display
+    st.markdown(f"**Last Update:** {last_modified_date}")
+else:
+    aggregates = load_snapshot_aggregates(rankings_date)
+    st.markdown(f"**Rankings as of:** {rankings_date}")
+snapshot = aggregates["sha256"]
+stats = cache_stats()
+st.sidebar.caption(f"Data cache: {stats['hits']} hits, {stats['misses']} misses. "
+                   f"Figure cache: {stats['figure_hits']} hits, {stats['figure_misses']} misses")
 
 # Create fixed-width container for proper alignment
 st.markdown(
@@ -122,371 +62,409 @@ st.markdown(
     unsafe_allow_html=True
 )
 
-# Generate correctly positioned flags with custom HTML
-flag_html = "<div class='flag-container'>"
-for country in country_counts_top["Country"]:
-    # Default to 'un' if not found
-    flag_code = flag_codes.get(country.upper(), 'un')
-    flag_html += f"<div class='flag-item'><img src='https://flagcdn.com/32x24/{flag_code.lower()}.png' width='32'></div>"
-flag_html += "</div>"
+# Country to flag code mapping - add more as needed
+flag_codes = {
+    "USA": "us", "ESP": "es", "FRA": "fr", "GBR": "gb", "ITA": "it",
+    "ARG": "ar", "AUS": "au", "GER": "de", "SUI": "ch", "CAN": "ca", "JPN": "jp", "CZE": "cz", "SRB": "rs", "AUT": "at",
+    "NED": "nl", "POL": "pl", "CRO": "hr", "BRA": "br", "RSA": "za",
+    "BEL": "be", "POR": "pt", "SWE": "se", "NOR": "no", "GRE": "gr", "CHN": "cn", "CHI": "cn"
+}
 
-# Display flags
-st.markdown(flag_html, unsafe_allow_html=True)
 
-# -------------------- ENHANCED AGE ANALYSIS --------------------
-st.markdown("### Age Distribution Analysis")
-
-# Create two columns for the age analysis
-age_col1, age_col2 = st.columns([3, 2])
-
-# Age Analysis
-age_values = df_top_n["Age"].dropna()
-q1, q3 = np.percentile(age_values, [25, 75])
-mean_age = np.mean(age_values)
-
-with age_col1:
-    # Create histogram for detailed age distribution
-    fig_age_hist = go.Figure()
-
-    # Add histogram
-    fig_age_hist.add_trace(go.Histogram(
-        x=df_top_n["Age"].dropna(),
-        nbinsx=20,
-        marker_color='rgba(52, 152, 219, 0.7)',
-        name="Age Distribution",
-        hovertemplate="Age: %{x}<br>Count: %{y}"
-    ))
-
-    # Add line for mean age
-    fig_age_hist.add_vline(x=mean_age, line_dash="dash", line_color="red",
-                           annotation_text=f"Mean: {mean_age:.1f}",
-                           annotation_position="top right")
-
-    # Add rug plot at the bottom for individual player ages
-    fig_age_hist.add_trace(go.Scatter(
-        x=df_top_n["Age"].dropna(),
-        y=[0] * len(df_top_n["Age"].dropna()),
-        mode="markers",
-        marker=dict(
-            symbol="line-ns",
-            color="rgba(0, 0, 0, 0.3)",
-            line=dict(width=1),
-            size=8
-        ),
-        hoverinfo="skip",
-        showlegend=False
-    ))
-
-    fig_age_hist.update_layout(
-        title=f"Age Distribution of Top {top_n} Players",
-        xaxis=dict(title="Age", range=[15, 45]),
-        yaxis=dict(title="Number of Players"),
-        bargap=0.1,
-        template="plotly_white",
-        height=400,
-    )
+def country_section(agg, top_n):
+    # Count of players by country
+    country_counts = pd.DataFrame(agg["country_counts"], columns=["Country", "Number of Players"])
+
+    # Get top 10 countries
+    country_counts_top = country_counts.head(10)
+
+    # Create the figure
+    def country_bar_figure():
+        fig = go.Figure()
+
+        # Add bars
+        fig.add_trace(go.Bar(
+            x=country_counts_top["Country"],
+            y=country_counts_top["Number of Players"],
+            hovertext=country_counts_top["Country"] + ": " +
+            country_counts_top["Number of Players"].astype(str) + " players",
+            marker=dict(color='rgb(52, 152, 219)', line=dict(
+                color='rgb(8, 48, 107)', width=1)),
+            text=country_counts_top["Number of Players"],
+            textposition='inside',
+            # Change text color to white and bold
+            textfont=dict(color="white", size=14, family="Arial Black")
+        ))
+
+        # Update layout
+        fig.update_layout(
+            title=f"Top 10 Countries by Player Count (from Top {top_n} Players by Rank)",
+            yaxis=dict(
+                title="Number of Players",
+                range=[0, max(country_counts_top["Number of Players"]) * 1.1]
+            ),
+            xaxis=dict(
+                tickangle=-45,
+            ),
+            bargap=0.2,
+            margin=dict(l=40, r=40, b=50, t=80),
+            showlegend=False,
+            template="plotly_white",
+            height=400,
+        )
 
-    st.plotly_chart(fig_age_hist)
-
-with age_col2:
-    # Display age summary statistics
-    st.subheader("Age Statistics")
-
-    min_age = df_top_n["Age"].min()
-    max_age = df_top_n["Age"].max()
-    median_age = df_top_n["Age"].median()
-    std_age = df_top_n["Age"].std()
-
-    age_stats_df = pd.DataFrame({
-        "Metric": ["Minimum Age", "Maximum Age", "Mean Age", "Median Age", "Q1 (25%)", "Q3 (75%)", "Std Deviation"],
-        "Value": [
-            f"{min_age:.1f}",
-            f"{max_age:.1f}",
-            f"{mean_age:.1f}",
-            f"{median_age:.1f}",
-            f"{q1:.1f}",
-            f"{q3:.1f}",
-            f"{std_age:.1f}"
-        ]
-    })
-
-    st.table(age_stats_df)
-
-    # Age Distribution Grouped by 5-Year Intervals
-    bins = list(range(15, 51, 5))  # 16-20, 21-25, ..., 46-50
-    labels = [f"{b}-{b+4}" for b in bins[:-1]]
-    df_top_n["Age Group"] = pd.cut(
-        df_top_n["Age"], bins=bins, labels=labels, right=True)
-    age_group_counts = df_top_n["Age Group"].value_counts().sort_index()
-
-    # Add age group bar chart
-    fig_age_groups = go.Figure()
-    fig_age_groups.add_trace(go.Bar(
-        x=age_group_counts.index,
-        y=age_group_counts.values,
-        marker_color='rgba(231, 76, 60, 0.7)',
-        text=age_group_counts.values,
-        textposition='outside',
-    ))
-
-    fig_age_groups.update_layout(
-        title="Players by Age Group",
-        xaxis=dict(title="Age Group"),
-        yaxis=dict(title="Count"),
-        showlegend=False,
-        height=250,
-        margin=dict(l=40, r=40, t=40, b=40),
-    )
+        # Fix the gap between y-axis and first bar
+        fig.update_xaxes(
+            range=[-0.5, len(country_counts_top)-0.5],
+            constrain="domain"
+        )
 
-    st.plotly_chart(fig_age_groups)
+        return fig
 
-# -------------------- PLAYERS PER POPULATION ANALYSIS --------------------
-st.markdown("### Players per Million Population")
-
-# Population data for top tennis countries (in millions, 2023 estimates)
-population_data = {
-    "USA": 331.9, "ESP": 47.4, "FRA": 67.8, "GBR": 67.3, "ITA": 60.3,
-    "ARG": 45.8, "AUS": 25.7, "GER": 83.1, "SUI": 8.7, "CAN": 38.2,
-    "JPN": 125.7, "CZE": 10.7, "SRB": 6.9, "AUT": 9.0, "NED": 17.4,
-    "POL": 37.8, "CRO": 4.0, "BRA": 213.4, "RSA": 60.0, "BEL": 11.6,
-    "POR": 10.3, "SWE": 10.4, "NOR": 5.4, "GRE": 10.6, "CHN": 1412.0,
-    "CHI": 19.2  # Chile
-}
+    # Display the chart
+    st.plotly_chart(cached_figure(snapshot, top_n, "country_bar", country_bar_figure))
 
-# Calculate players per million for each country in the dataset
-country_counts_all = df_top_n["Country"].value_counts().reset_index()
-country_counts_all.columns = ["Country", "Number of Players"]
-
-# Add population data and calculate players per million
-country_counts_all["Population (M)"] = country_counts_all["Country"].map(
-    population_data)
-country_counts_all["Players per Million"] = country_counts_all.apply(
-    lambda row: row["Number of Players"] /
-    row["Population (M)"] if pd.notna(row["Population (M)"]) else None,
-    axis=1
-)
+    # Generate correctly positioned flags with custom HTML
+    flag_html = "<div class='flag-container'>"
+    for country in country_counts_top["Country"]:
+        # Default to 'un' if not found
+        flag_code = flag_codes.get(country.upper(), 'un')
+        flag_html += f"<div class='flag-item'><img src='https://flagcdn.com/32x24/{flag_code.lower()}.png' width='32'></div>"
+    flag_html += "</div>"
 
-# Filter out countries with missing population data
-country_counts_all = country_counts_all.dropna(subset=["Players per Million"])
-
-# Sort by players per million and get top 15
-top_per_capita = country_counts_all.sort_values(
-    "Players per Million", ascending=False).head(15)
-
-# Create visualization
-fig_per_capita = go.Figure()
-
-# Add bars
-fig_per_capita.add_trace(go.Bar(
-    x=top_per_capita["Country"],
-    y=top_per_capita["Players per Million"],
-    marker_color='rgba(46, 204, 113, 0.7)',
-    text=[f"{x:.2f}" for x in top_per_capita["Players per Million"]],
-    textposition='outside',
-))
-
-# Update layout
-fig_per_capita.update_layout(
-    title=f"Top 15 Countries by Top {top_n} Players per Million Population",
-    xaxis=dict(title="Country", tickangle=-45),
-    yaxis=dict(title="Players per Million Population"),
-    height=500,
-    margin=dict(l=40, r=40, b=80, t=80),
-    template="plotly_white",
-)
+    # Display flags
+    st.markdown(flag_html, unsafe_allow_html=True)
 
-st.plotly_chart(fig_per_capita)
 
-# Add a data table for reference
-st.subheader("Country Breakdown by Population")
-display_df = top_per_capita[["Country", "Number of Players", "Population (M)", "Players per Million"]].sort_values(
-    "Players per Million", ascending=False
-)
-display_df = display_df.reset_index(drop=True)
-display_df["Players per Million"] = display_df["Players per Million"].round(2)
-st.dataframe(display_df)
+# -------------------- ENHANCED AGE ANALYSIS --------------------
+def age_section(agg, top_n):
+    st.markdown("### Age Distribution Analysis")
+
+    # Create two columns for the age analysis
+    age_col1, age_col2 = st.columns([3, 2])
+
+    # Age Analysis
+    age_values = agg["ages"]
+    mean_age = agg["age_stats"]["mean"]
+
+    with age_col1:
+        # Create histogram for detailed age distribution
+        def age_histogram_figure():
+            fig_age_hist = go.Figure()
+
+            # Add histogram
+            fig_age_hist.add_trace(go.Histogram(
+                x=age_values,
+                nbinsx=20,
+                marker_color='rgba(52, 152, 219, 0.7)',
+                name="Age Distribution",
+                hovertemplate="Age: %{x}<br>Count: %{y}"
+            ))
+
+            # Add line for mean age
+            fig_age_hist.add_vline(x=mean_age, line_dash="dash", line_color="red",
+                                   annotation_text=f"Mean: {mean_age:.1f}",
+                                   annotation_position="top right")
+
+            # Add rug plot at the bottom for individual player ages
+            fig_age_hist.add_trace(go.Scatter(
+                x=age_values,
+                y=[0] * len(age_values),
+                mode="markers",
+                marker=dict(
+                    symbol="line-ns",
+                    color="rgba(0, 0, 0, 0.3)",
+                    line=dict(width=1),
+                    size=8
+                ),
+                hoverinfo="skip",
+                showlegend=False
+            ))
+
+            fig_age_hist.update_layout(
+                title=f"Age Distribution of Top {top_n} Players",
+                xaxis=dict(title="Age", range=[15, 45]),
+                yaxis=dict(title="Number of Players"),
+                bargap=0.1,
+                template="plotly_white",
+                height=400,
+            )
+            return fig_age_hist
+
+        st.plotly_chart(cached_figure(snapshot, top_n, "age_histogram", age_histogram_figure))
+
+    with age_col2:
+        # Display age summary statistics
+        st.subheader("Age Statistics")
+
+        age_stats = agg["age_stats"]
+        age_stats_df = pd.DataFrame({
+            "Metric": ["Minimum Age", "Maximum Age", "Mean Age", "Median Age", "Q1 (25%)", "Q3 (75%)", "Std Deviation"],
+            "Value": [
+                f"{age_stats[key]:.1f}" for key in ["min", "max", "mean", "median", "q1", "q3", "std"]
+            ]
+        })
 
-# -------------------- CONTINENT ANALYSIS --------------------
-st.markdown("### Player Distribution by Continent")
-
-# Country to continent mapping
-continent_mapping = {
-    # Europe
-    "ESP": "Europe", "FRA": "Europe", "GBR": "Europe", "ITA": "Europe",
-    "GER": "Europe", "SUI": "Europe", "CZE": "Europe", "SRB": "Europe",
-    "AUT": "Europe", "NED": "Europe", "POL": "Europe", "CRO": "Europe",
-    "BEL": "Europe", "POR": "Europe", "SWE": "Europe", "NOR": "Europe",
-    "GRE": "Europe", "BUL": "Europe", "ROU": "Europe", "HUN": "Europe",
-    "SVK": "Europe", "FIN": "Europe", "DEN": "Europe", "UKR": "Europe",
-    "LAT": "Europe", "EST": "Europe", "LTU": "Europe", "SLO": "Europe",
-    "MDA": "Europe", "RUS": "Europe", "BLR": "Europe", "MNE": "Europe",
-    "BIH": "Europe", "LUX": "Europe", "IRL": "Europe", "ISL": "Europe",
-
-    # North America
-    "USA": "North America", "CAN": "North America", "MEX": "North America",
-    "DOM": "North America", "PUR": "North America",
-
-    # South America
-    "ARG": "South America", "BRA": "South America", "CHI": "South America",
-    "COL": "South America", "URU": "South America", "ECU": "South America",
-    "PER": "South America", "VEN": "South America", "BOL": "South America",
-    "PAR": "South America",
-
-    # Asia
-    "JPN": "Asia", "CHN": "Asia", "KOR": "Asia", "IND": "Asia",
-    "TPE": "Asia", "UZB": "Asia", "KAZ": "Asia", "THA": "Asia",
-    "HKG": "Asia", "PAK": "Asia", "MAS": "Asia", "SIN": "Asia",
-
-    # Oceania
-    "AUS": "Oceania", "NZL": "Oceania",
-
-    # Africa
-    "RSA": "Africa", "TUN": "Africa", "MAR": "Africa", "EGY": "Africa",
-    "ALG": "Africa", "ZIM": "Africa", "NGR": "Africa", "KEN": "Africa"
-}
+        st.table(age_stats_df)
 
-# Add continent to the dataframe
-df_top_n["Continent"] = df_top_n["Country"].map(continent_mapping)
-
-# Count players by continent
-continent_counts = df_top_n["Continent"].value_counts().reset_index()
-continent_counts.columns = ["Continent", "Number of Players"]
-
-# Calculate percentage
-total_players = continent_counts["Number of Players"].sum()
-continent_counts["Percentage"] = (
-    continent_counts["Number of Players"] / total_players * 100).round(1)
-
-# Sort by number of players
-continent_counts = continent_counts.sort_values(
-    "Number of Players", ascending=False)
-
-# Create two columns
-cont_col1, cont_col2 = st.columns([2, 1])
-
-with cont_col1:
-    # Create pie chart
-    fig_continent = go.Figure()
-    fig_continent.add_trace(go.Pie(
-        labels=continent_counts["Continent"],
-        values=continent_counts["Number of Players"],
-        hole=0.4,
-        marker=dict(
-            colors=[
-                'rgba(52, 152, 219, 0.8)',  # Blue (Europe)
-                'rgba(46, 204, 113, 0.8)',  # Green (North America)
-                'rgba(155, 89, 182, 0.8)',  # Purple (South America)
-                'rgba(241, 196, 15, 0.8)',  # Yellow (Asia)
-                'rgba(230, 126, 34, 0.8)',  # Orange (Oceania)
-                'rgba(231, 76, 60, 0.8)',   # Red (Africa)
-            ]
-        ),
-        textinfo="label+percent",
-        hoverinfo="label+value+percent",
-        textfont=dict(size=14)
-    ))
-
-    fig_continent.update_layout(
-        title=f"Distribution of Top {top_n} Players by Continent",
-        height=500,
-        showlegend=True,
-        legend=dict(
-            orientation="h",
-            yanchor="bottom",
-            y=-0.2,
-            xanchor="center",
-            x=0.5
+        # Age Distribution Grouped by 5-Year Intervals
+        age_group_counts = pd.Series(dict(agg["age_groups"]))
+
+        # Add age group bar chart
+        def age_groups_figure():
+            fig_age_groups = go.Figure()
+            fig_age_groups.add_trace(go.Bar(
+                x=age_group_counts.index,
+                y=age_group_counts.values,
+                marker_color='rgba(231, 76, 60, 0.7)',
+                text=age_group_counts.values,
+                textposition='outside',
+            ))
+
+            fig_age_groups.update_layout(
+                title="Players by Age Group",
+                xaxis=dict(title="Age Group"),
+                yaxis=dict(title="Count"),
+                showlegend=False,
+                height=250,
+                margin=dict(l=40, r=40, t=40, b=40),
+            )
+            return fig_age_groups
+
+        st.plotly_chart(cached_figure(snapshot, top_n, "age_groups", age_groups_figure))
+
+
+# -------------------- PLAYERS PER POPULATION ANALYSIS --------------------
+def per_capita_section(agg, top_n):
+    st.markdown("### Players per Million Population")
+
+    # Top 15 countries by players per million, among those with population data
+    top_per_capita = pd.DataFrame(agg["per_capita"], columns=[
+        "Country", "Number of Players", "Population (M)", "Players per Million"])
+
+    # Create visualization
+    def per_capita_figure():
+        fig_per_capita = go.Figure()
+
+        # Add bars
+        fig_per_capita.add_trace(go.Bar(
+            x=top_per_capita["Country"],
+            y=top_per_capita["Players per Million"],
+            marker_color='rgba(46, 204, 113, 0.7)',
+            text=[f"{x:.2f}" for x in top_per_capita["Players per Million"]],
+            textposition='outside',
+        ))
+
+        # Update layout
+        fig_per_capita.update_layout(
+            title=f"Top 15 Countries by Top {top_n} Players per Million Population",
+            xaxis=dict(title="Country", tickangle=-45),
+            yaxis=dict(title="Players per Million Population"),
+            height=500,
+            margin=dict(l=40, r=40, b=80, t=80),
+            template="plotly_white",
         )
+        return fig_per_capita
+
+    st.plotly_chart(cached_figure(snapshot, top_n, "per_capita", per_capita_figure))
+
+    # Add a data table for reference
+    st.subheader("Country Breakdown by Population")
+    display_df = top_per_capita[["Country", "Number of Players", "Population (M)", "Players per Million"]].sort_values(
+        "Players per Million", ascending=False
     )
+    display_df = display_df.reset_index(drop=True)
+    display_df["Players per Million"] = display_df["Players per Million"].round(2)
+    st.dataframe(display_df)
 
-    st.plotly_chart(fig_continent)
-
-with cont_col2:
-    # Display table with absolute numbers
-    st.subheader("Players by Continent")
-    continent_table = continent_counts.copy()
-    continent_table["Percentage"] = continent_table["Percentage"].apply(
-        lambda x: f"{x}%")
-    st.table(continent_table)
-
-    # Show top countries per continent
-    st.subheader("Top Country per Continent")
-    top_country_per_continent = []
-
-    for continent in continent_counts["Continent"]:
-        # Filter countries in this continent
-        continent_countries = df_top_n[df_top_n["Continent"]
-                                       == continent]["Country"].value_counts()
-        if not continent_countries.empty:
-            top_country = continent_countries.index[0]
-            count = continent_countries.iloc[0]
-            top_country_per_continent.append({
-                "Continent": continent,
-                "Top Country": top_country,
-                "Players": count
-            })
-
-    top_country_df = pd.DataFrame(top_country_per_continent)
-    st.table(top_country_df)
 
-# -------------------- AGE DISTRIBUTION BY TOP COUNTRIES --------------------
-st.markdown("### Age Distribution by Top Countries")
-
-# Get top 8 countries by player count
-top_countries = df_top_n["Country"].value_counts().head(8).index.tolist()
-
-# Filter data for these countries
-top_countries_data = df_top_n[df_top_n["Country"].isin(top_countries)]
-
-# Create box plot
-fig_age_country = go.Figure()
-
-for country in top_countries:
-    country_data = top_countries_data[top_countries_data["Country"]
-                                      == country]["Age"].dropna()
-
-    # Skip if no data
-    if len(country_data) == 0:
-        continue
-
-    # Add box plot for this country
-    fig_age_country.add_trace(go.Box(
-        y=country_data,
-        name=country,
-        boxpoints='all',  # Show all points
-        jitter=0.3,
-        pointpos=-1.8,
-        marker=dict(size=4),
-        boxmean=True  # Show mean
-    ))
-
-fig_age_country.update_layout(
-    title="Age Distribution Across Top 8 Tennis Nations",
-    yaxis=dict(title="Age"),
-    xaxis=dict(title="Country"),
-    height=500,
-    template="plotly_white",
-    showlegend=False
-)
+# -------------------- CONTINENT ANALYSIS --------------------
+def continent_section(agg, top_n):
+    st.markdown("### Player Distribution by Continent")
+
+    # Players by continent, with their share of the top N
+    continent_counts = pd.DataFrame(agg["continents"], columns=["Continent", "Number of Players", "Percentage"])
+
+    # Create two columns
+    cont_col1, cont_col2 = st.columns([2, 1])
+
+    with cont_col1:
+        # Create pie chart
+        def continent_figure():
+            fig_continent = go.Figure()
+            fig_continent.add_trace(go.Pie(
+                labels=continent_counts["Continent"],
+                values=continent_counts["Number of Players"],
+                hole=0.4,
+                marker=dict(
+                    colors=[
+                        'rgba(52, 152, 219, 0.8)',  # Blue (Europe)
+                        'rgba(46, 204, 113, 0.8)',  # Green (North America)
+                        'rgba(155, 89, 182, 0.8)',  # Purple (South America)
+                        'rgba(241, 196, 15, 0.8)',  # Yellow (Asia)
+                        'rgba(230, 126, 34, 0.8)',  # Orange (Oceania)
+                        'rgba(231, 76, 60, 0.8)',   # Red (Africa)
+                    ]
+                ),
+                textinfo="label+percent",
+                hoverinfo="label+value+percent",
+                textfont=dict(size=14)
+            ))
+
+            fig_continent.update_layout(
+                title=f"Distribution of Top {top_n} Players by Continent",
+                height=500,
+                showlegend=True,
+                legend=dict(
+                    orientation="h",
+                    yanchor="bottom",
+                    y=-0.2,
+                    xanchor="center",
+                    x=0.5
+                )
+            )
+            return fig_continent
+
+        st.plotly_chart(cached_figure(snapshot, top_n, "continent_pie", continent_figure))
+
+    with cont_col2:
+        # Display table with absolute numbers
+        st.subheader("Players by Continent")
+        continent_table = continent_counts.copy()
+        continent_table["Percentage"] = continent_table["Percentage"].apply(
+            lambda x: f"{x}%")
+        st.table(continent_table)
+
+        # Show top countries per continent
+        st.subheader("Top Country per Continent")
+        top_country_df = pd.DataFrame(agg["top_country_per_continent"],
+                                      columns=["Continent", "Top Country", "Players"])
+        st.table(top_country_df)
 
-st.plotly_chart(fig_age_country)
 
-# Add a table with age stats by country
-age_stats_by_country = []
+# -------------------- AGE DISTRIBUTION BY TOP COUNTRIES --------------------
+def top_countries_section(agg, top_n):
+    st.markdown("### Age Distribution by Top Countries")
+
+    # Box plot for each of the top 8 countries by player count
+    def country_ages_figure():
+        fig_age_country = go.Figure()
+
+        for country_stats in agg["top_countries"]:
+            fig_age_country.add_trace(go.Box(
+                y=country_stats["Ages"],
+                name=country_stats["Country"],
+                boxpoints='all',  # Show all points
+                jitter=0.3,
+                pointpos=-1.8,
+                marker=dict(size=4),
+                boxmean=True  # Show mean
+            ))
+
+        fig_age_country.update_layout(
+            title="Age Distribution Across Top 8 Tennis Nations",
+            yaxis=dict(title="Age"),
+            xaxis=dict(title="Country"),
+            height=500,
+            template="plotly_white",
+            showlegend=False
+        )
+        return fig_age_country
+
+    st.plotly_chart(cached_figure(snapshot, top_n, "country_ages", country_ages_figure))
+
+    # Add a table with age stats by country
+    age_stats_country_df = pd.DataFrame(agg["top_countries"]).drop(columns="Ages")
+    st.table(age_stats_country_df)
+
+
+# -------------------- TRENDS OVER TIME --------------------
+def trends_section(agg, top_n):
+    st.markdown("### Trends Over Time")
+
+    # Read from the trend cube, which grows by one small block per snapshot
+    cube, cube_version = load_trend_cube()
+    trend_col1, trend_col2 = st.columns(2)
+
+    with trend_col1:
+        # Player counts of the 8 countries leading on the latest date
+        def country_trend_figure():
+            counts = country_trend(cube, top_n)
+            leaders = counts.iloc[-1].sort_values(ascending=False).head(8).index
+            fig_country_trend = go.Figure()
+            for country in leaders:
+                fig_country_trend.add_trace(go.Scatter(
+                    x=counts.index,
+                    y=counts[country],
+                    mode="lines+markers",
+                    name=str(country),
+                ))
+
+            fig_country_trend.update_layout(
+                title=f"Players in the Top {top_n} by Country",
+                xaxis=dict(title="Date"),
+                yaxis=dict(title="Number of Players"),
+                height=450,
+                template="plotly_white",
+            )
+            return fig_country_trend
+
+        st.plotly_chart(cached_figure(f"trend_cube:{cube_version}", top_n, "country_trend",
+                                      country_trend_figure))
+
+    with trend_col2:
+        def age_trend_figure():
+            mean_age = mean_age_trend(cube, top_n)
+            fig_age_trend = go.Figure()
+            fig_age_trend.add_trace(go.Scatter(
+                x=mean_age.index,
+                y=mean_age.round(2),
+                mode="lines+markers",
+                marker_color='rgba(231, 76, 60, 0.8)',
+            ))
+
+            fig_age_trend.update_layout(
+                title=f"Mean Age of the Top {top_n} Players",
+                xaxis=dict(title="Date"),
+                yaxis=dict(title="Mean Age"),
+                height=450,
+                showlegend=False,
+                template="plotly_white",
+            )
+            return fig_age_trend
+
+        st.plotly_chart(cached_figure(f"trend_cube:{cube_version}", top_n, "age_trend", age_trend_figure))
+
+
+@st.fragment
+def lazy_section(title, render, agg, top_n):
+    # Below the fold: built only once opened, and opening or closing it
+    # reruns only this fragment
+    if st.toggle(f"Show {title}", key=f"show_{render.__name__}"):
+        render(agg, top_n)
+
+
+@st.fragment
+def dashboard(aggregates):
+    # Changing top N reruns only this fragment, not the page setup above
+    # Add buttons for selecting top N players (horizontal layout)
+    st.markdown("### Top ATP Stats country and age")
+    top_n = st.radio(
+        "Select top N players",
+        options=TOP_N_OPTIONS,
+        index=2,  # Default to top 1000
+        horizontal=True
+    )
 
-for country in top_countries:
-    country_ages = top_countries_data[top_countries_data["Country"]
-                                      == country]["Age"].dropna()
+    # Aggregates of the top N players BY RANK
+    agg = aggregates["top_n"][str(top_n)]
+
+    country_section(agg, top_n)
+    age_section(agg, top_n)
+    per_capita_section(agg, top_n)
+    lazy_section("Player Distribution by Continent", continent_section, agg, top_n)
+    lazy_section("Age Distribution by Top Countries", top_countries_section, agg, top_n)
+    lazy_section("Trends Over Time", trends_section, agg, top_n)
 
-    if len(country_ages) > 0:
-        age_stats_by_country.append({
-            "Country": country,
-            "Count": len(country_ages),
-            "Min Age": round(country_ages.min(), 1),
-            "Max Age": round(country_ages.max(), 1),
-            "Mean Age": round(country_ages.mean(), 1),
-            "Median Age": round(country_ages.median(), 1)
-        })
 
-age_stats_country_df = pd.DataFrame(age_stats_by_country)
-st.table(age_stats_country_df)
\ No newline at end of file
+dashboard(aggregates)
@@ -0,0 +1,136 @@
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime
+
+METRICS_DIR = os.environ.get("METRICS_DIR", "metrics")
+RUNS_FILE = os.path.join(METRICS_DIR, "scrape_runs.jsonl")
+
+# Point this at node_exporter's --collector.textfile.directory
+PROM_FILE = os.path.join(os.environ.get("PROM_TEXTFILE_DIR", METRICS_DIR), "atp_scraper.prom")
+
+# Always exported, as 0 when a run skipped them, so series don't disappear
+PHASES = ["http_fetch", "setup_driver", "driver_get", "page_load_sleep", "webdriver_wait",
+          "parse_rows", "csv_write", "movement", "publish", "aggregate", "history_ingest", "commit_to_git"]
+COUNTERS = ["rows_parsed", "rows_rejected", "rows_changed"]
+
+
+class RunMetrics:
+    """
+    Phase timings and row counters for one scrape run.
+
+    Spans add up, so a phase that runs once per source (or in several
+    threads at once) reports its total time across the run.
+    """
+
+    def __init__(self):
+        self.started_at = time.time()
+        self.spans = defaultdict(float)
+        self.counters = defaultdict(int)
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - start)
+
+    def add_time(self, name, seconds):
+        with self._lock:
+            self.spans[name] += seconds
+
+    def count(self, name, n=1):
+        with self._lock:
+            self.counters[name] += n
+
+
+_current = RunMetrics()
+_runs_total = defaultdict(int)
+
+
+def span(name):
+    return _current.span(name)
+
+
+def add_time(name, seconds):
+    _current.add_time(name, seconds)
+
+
+def count(name, n=1):
+    _current.count(name, n)
+
+
+def start_run():
+    global _current
+    _current = RunMetrics()
+    return _current
+
+
+def finish_run(status, runs_file=RUNS_FILE, prom_file=PROM_FILE):
+    """
+    Append this run's JSON record and rewrite the Prometheus textfile
+    """
+    run = _current
+    _runs_total[status] += 1
+    record = {
+        "started_at": datetime.fromtimestamp(run.started_at).isoformat(timespec="seconds"),
+        "duration": round(time.time() - run.started_at, 4),
+        "status": status,
+        "phases": {name: round(seconds, 4) for name, seconds in sorted(run.spans.items())},
+        "counters": dict(sorted(run.counters.items())),
+    }
+
+    try:
+        os.makedirs(os.path.dirname(runs_file) or ".", exist_ok=True)
+        with open(runs_file, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+        write_prometheus(record, prom_file)
+    except OSError as e:
+        print(f"Could not write metrics: {e}", flush=True)
+
+    return record
+
+
+def write_prometheus(record, prom_file=PROM_FILE):
+    lines = [
+        "# HELP atp_scrape_phase_seconds Time spent in each phase of the last scrape run.",
+        "# TYPE atp_scrape_phase_seconds gauge",
+    ]
+    phases = dict.fromkeys(PHASES, 0)
+    phases.update(record["phases"])
+    for phase, seconds in phases.items():
+        lines.append(f'atp_scrape_phase_seconds{{phase="{phase}"}} {seconds}')
+
+    lines += [
+        "# HELP atp_scrape_rows Rows counted during the last scrape run.",
+        "# TYPE atp_scrape_rows gauge",
+    ]
+    counters = dict.fromkeys(COUNTERS, 0)
+    counters.update(record["counters"])
+    for kind, value in counters.items():
+        lines.append(f'atp_scrape_rows{{kind="{kind}"}} {value}')
+
+    lines += [
+        "# HELP atp_scrape_duration_seconds Wall time of the last scrape run.",
+        "# TYPE atp_scrape_duration_seconds gauge",
+        f"atp_scrape_duration_seconds {record['duration']}",
+        "# HELP atp_scrape_last_run_timestamp_seconds When the last scrape run started.",
+        "# TYPE atp_scrape_last_run_timestamp_seconds gauge",
+        f"atp_scrape_last_run_timestamp_seconds {int(_current.started_at)}",
+        "# HELP atp_scrape_runs_total Scrape runs since the process started, by outcome.",
+        "# TYPE atp_scrape_runs_total counter",
+    ]
+    for status, total in sorted(_runs_total.items()):
+        lines.append(f'atp_scrape_runs_total{{status="{status}"}} {total}')
+
+    os.makedirs(os.path.dirname(prom_file) or ".", exist_ok=True)
+    # Write next to the target and rename so node_exporter never reads half a file
+    tmp_file = f"{prom_file}.{os.getpid()}.tmp"
+    with open(tmp_file, "w", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+    os.replace(tmp_file, prom_file)
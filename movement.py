@@ -0,0 +1,143 @@
+"""
+Rank and points movement of every player against earlier snapshots
+
+Usage:
+    python movement.py atp_rankings_data/atp_rankings_2025-03-10.csv [...]
+
+Adds, for each baseline, a "Rank Delta<suffix>" column (places climbed,
+negative when dropping) and a "Points Delta<suffix>" column to a snapshot
+CSV. Baselines come from the snapshot store; a player missing from a
+baseline, or a baseline with no snapshot close enough, is left blank.
+"""
+import argparse
+import os
+from datetime import date, timedelta
+
+import pandas as pd
+
+from delta_store import SnapshotStore, row_width
+from player_registry import snapshot_player_ids
+from publish import atomic_path
+from snapshots import SNAPSHOT_HEADER, snapshot_identity
+
+# Comma-separated names from BASELINES
+MOVEMENT_BASELINES = os.environ.get("MOVEMENT_BASELINES", "previous,monday,52w")
+
+# A baseline snapshot older than its target date by more than this is
+# too stale to compare against
+MAX_BASELINE_GAP = timedelta(days=7)
+
+
+def previous_day(day):
+    return day - timedelta(days=1)
+
+
+def last_monday(day):
+    # The Monday before day, a week back when day is itself a Monday
+    return day - timedelta(days=day.weekday() or 7)
+
+
+def weeks_ago_52(day):
+    return day - timedelta(weeks=52)
+
+
+# name: (column suffix, target date, whether any older snapshot will do)
+BASELINES = {
+    "previous": ("", previous_day, True),
+    "monday": (" Monday", last_monday, False),
+    "52w": (" 52W", weeks_ago_52, False),
+}
+
+
+def movement_columns(baselines=MOVEMENT_BASELINES):
+    columns = []
+    for name in baselines.split(","):
+        suffix = BASELINES[name.strip()][0]
+        columns += [f"Rank Delta{suffix}", f"Points Delta{suffix}"]
+    return columns
+
+
+def baseline_date(dates, day, target, any_older):
+    """
+    Latest stored date on or before target(day), or None
+    """
+    wanted = target(day)
+    earlier = [d for d in dates if d <= wanted]
+    if not earlier:
+        return None
+    if not any_older and wanted - earlier[-1] > MAX_BASELINE_GAP:
+        return None
+    return earlier[-1]
+
+
+def with_player_ids(df):
+    # Compared as strings, like every other column read here
+    df["Player ID"] = [str(player_id) for player_id in
+                       snapshot_player_ids(df["Player Name"], df.get("Player ID"))]
+    return df
+
+
+def numeric(column):
+    return pd.to_numeric(column.str.replace(",", ""), errors="coerce")
+
+
+def baseline_frame(rows):
+    width = row_width(rows)
+    df = with_player_ids(pd.DataFrame(rows, columns=SNAPSHOT_HEADER[:width]))
+    return pd.DataFrame({
+        "Player ID": df["Player ID"],
+        "base_rank": numeric(df["Rank"]),
+        "base_points": numeric(df["Points"]),
+    }).drop_duplicates("Player ID")
+
+
+def add_movement(filename, store=None, baselines=MOVEMENT_BASELINES):
+    """
+    Join the snapshot against each baseline by player ID and rewrite it
+    with the delta columns appended. Returns the baselines used.
+    """
+    prefix, day = snapshot_identity(filename)
+    store = store or SnapshotStore(prefix)
+    dates = [d for d in map(date.fromisoformat, store.dates()) if d < day]
+
+    df = pd.read_csv(filename, dtype=str, keep_default_na=False)
+    df = with_player_ids(df)
+    # Recomputing replaces the columns from an earlier run
+    df = df.drop(columns=[c for c in movement_columns(",".join(BASELINES)) if c in df.columns])
+    rank = numeric(df["Rank"])
+    points = numeric(df["Points"])
+
+    used = {}
+    for name in baselines.split(","):
+        suffix, target, any_older = BASELINES[name.strip()]
+        base_day = baseline_date(dates, day, target, any_older)
+        used[name.strip()] = str(base_day) if base_day else None
+
+        if base_day is None:
+            rank_delta = points_delta = pd.Series(pd.NA, index=df.index, dtype="Int32")
+        else:
+            base = df[["Player ID"]].merge(baseline_frame(store.read(base_day)),
+                                           on="Player ID", how="left")
+            rank_delta = (base["base_rank"] - rank).astype("Int32")
+            points_delta = (points - base["base_points"]).astype("Int32")
+
+        df[f"Rank Delta{suffix}"] = rank_delta.astype(str).replace("<NA>", "")
+        df[f"Points Delta{suffix}"] = points_delta.astype(str).replace("<NA>", "")
+
+    with atomic_path(filename) as tmp_filename:
+        # Same line endings as save_to_csv()
+        df.to_csv(tmp_filename, index=False, lineterminator="\r\n")
+    return used
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Add rank/points movement columns to snapshots")
+    parser.add_argument("files", nargs="+")
+    args = parser.parse_args()
+
+    for path in args.files:
+        print(f"{path}: baselines {add_movement(path)}")
+
+
+if __name__ == "__main__":
+    main()
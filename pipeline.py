@@ -0,0 +1,61 @@
+"""
+What happens to a freshly scraped snapshot, shared by ranking.py and
+ranking_railway.py
+"""
+import metrics
+from aggregates import write_aggregates
+from delta_store import add_snapshot
+from history_db import load_snapshot
+from history_store import ingest_snapshot
+from movement import add_movement
+from publish import publish_snapshot
+from trend_cube import add_to_cube
+
+
+def store_snapshot(new_data_file, main=True, name=None):
+    """
+    Add the movement columns to a saved snapshot and file it everywhere.
+
+    The main source is also published as the live rankings table, with its
+    dashboard aggregates and trend cube rows. Every source then goes into
+    the snapshot store and the Parquet and SQLite histories. Each step has
+    its own metrics span, and a failing step is logged without stopping
+    the others; only a failed publish raises.
+    """
+    def log(message):
+        print(f"{name}: {message}" if name else message, flush=True)
+
+    with metrics.span("movement"):
+        try:
+            log(f"Movement baselines: {add_movement(new_data_file)}")
+        except Exception as e:
+            log(f"Could not compute movement: {e}")
+
+    if main:
+        with metrics.span("publish"):
+            publish_snapshot(new_data_file)
+        with metrics.span("aggregate"):
+            try:
+                log(f"Dashboard aggregates: {write_aggregates() or 'up to date'}")
+            except Exception as e:
+                log(f"Could not precompute dashboard aggregates: {e}")
+            try:
+                log(f"Trend cube: {add_to_cube(new_data_file)} rows added")
+            except Exception as e:
+                log(f"Could not add {new_data_file} to the trend cube: {e}")
+
+    # The snapshot store is the history git carries, Parquet and SQLite
+    # are rebuilt from it, so a failing cache can't cost a day
+    with metrics.span("history_ingest"):
+        try:
+            log(f"Stored in snapshot store as {add_snapshot(new_data_file)}")
+        except Exception as e:
+            log(f"Could not add {new_data_file} to the snapshot store: {e}")
+        try:
+            log(f"Added to Parquet history: {ingest_snapshot(new_data_file)}")
+        except Exception as e:
+            log(f"Could not add {new_data_file} to the Parquet history: {e}")
+        try:
+            load_snapshot(new_data_file)
+        except Exception as e:
+            log(f"Could not add {new_data_file} to the SQLite history: {e}")
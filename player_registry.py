@@ -0,0 +1,160 @@
+"""
+Stable integer IDs for players, keyed by a normalized form of their name
+
+Usage:
+    python player_registry.py seed atp_rankings_data/*.csv
+    python player_registry.py lookup "Novak Djokovic"
+"""
+import argparse
+import csv
+import json
+import os
+import threading
+import unicodedata
+
+from publish import atomic_path
+
+REGISTRY_FILE = os.environ.get("PLAYER_REGISTRY", os.path.join("history", "players.csv"))
+
+# Hand-maintained {"alias": "name as already registered"} for spellings
+# that normalization alone doesn't merge
+ALIASES_FILE = "player_aliases.json"
+
+# Letters NFKD doesn't split into base letter + accent
+FOLDED_LETTERS = str.maketrans({
+    "đ": "d", "ð": "d", "ø": "o", "ł": "l", "ß": "ss", "æ": "ae", "œ": "oe", "ı": "i", "þ": "th",
+    "-": " ", "‐": " ", "'": "", "’": "", ".": "",
+})
+
+
+def normalize_name(name):
+    """
+    "Félix  Auger-Aliassime" -> "felix auger aliassime"
+    """
+    name = name.casefold().translate(FOLDED_LETTERS)
+    name = "".join(c for c in unicodedata.normalize("NFKD", name) if not unicodedata.combining(c))
+    return " ".join(name.split())
+
+
+class PlayerRegistry:
+    """
+    Player IDs are handed out once, in order of first appearance, and never
+    change; the registry file only ever grows
+    """
+
+    def __init__(self, path=REGISTRY_FILE, aliases_file=ALIASES_FILE):
+        self.path = path
+        self.names = {}
+        self.ids = {}
+        self.aliases = {}
+        self.dirty = False
+        self._lock = threading.Lock()
+
+        if os.path.exists(path):
+            with open(path, newline="", encoding="utf-8") as f:
+                for row in csv.DictReader(f):
+                    player_id = int(row["ID"])
+                    self.names[player_id] = row["Player Name"]
+                    self.ids[normalize_name(row["Player Name"])] = player_id
+
+        if aliases_file and os.path.exists(aliases_file):
+            with open(aliases_file, encoding="utf-8") as f:
+                for alias, name in json.load(f)["aliases"].items():
+                    self.aliases[normalize_name(alias)] = normalize_name(name)
+
+    def key(self, name):
+        key = normalize_name(name)
+        return self.aliases.get(key, key)
+
+    def lookup(self, name):
+        return self.ids.get(self.key(name))
+
+    def id_for(self, name):
+        """
+        The player's ID, registering them if this is their first appearance
+        """
+        key = self.key(name)
+        player_id = self.ids.get(key)
+        if player_id is not None:
+            return player_id
+
+        with self._lock:
+            if key not in self.ids:
+                player_id = len(self.names) + 1
+                self.names[player_id] = name
+                self.ids[key] = player_id
+                self.dirty = True
+            return self.ids[key]
+
+    def save(self):
+        with self._lock:
+            if not self.dirty:
+                return
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with atomic_path(self.path) as tmp_path:
+                with open(tmp_path, "w", newline="", encoding="utf-8") as f:
+                    writer = csv.writer(f)
+                    writer.writerow(["ID", "Player Name"])
+                    writer.writerows(sorted(self.names.items()))
+            self.dirty = False
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_registry():
+    """
+    The registry shared by everything in this process
+    """
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = PlayerRegistry()
+        return _registry
+
+
+def snapshot_player_ids(names, ids=None):
+    """
+    [player ID] for a snapshot's names. ids is its Player ID column, which
+    snapshots from before the registry don't have (None) or leave blank;
+    those players are looked up, and registered, by name.
+    """
+    registry = get_registry()
+    if ids is None:
+        ids = [None] * len(names)
+    player_ids = [int(player_id) if str(player_id).isdigit() else registry.id_for(name)
+                  for name, player_id in zip(names, ids)]
+    registry.save()
+    return player_ids
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Player ID registry")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    seed = commands.add_parser("seed", help="register every player in these snapshots, oldest first")
+    seed.add_argument("files", nargs="+")
+
+    lookup = commands.add_parser("lookup", help="print a player's ID")
+    lookup.add_argument("name")
+
+    args = parser.parse_args()
+    registry = get_registry()
+
+    if args.command == "seed":
+        before = len(registry.names)
+        # Dated file names sort in date order
+        for path in sorted(args.files, key=os.path.basename):
+            with open(path, newline="", encoding="utf-8") as f:
+                for row in csv.DictReader(f):
+                    registry.id_for(row["Player Name"])
+        registry.save()
+        print(f"{len(registry.names) - before} new players, {len(registry.names)} in total")
+    else:
+        player_id = registry.lookup(args.name)
+        print(f"{player_id}\t{registry.names[player_id]}" if player_id else "Not registered")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+import csv
+import glob
+import hashlib
+import json
+import os
+import shutil
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+
+import metrics
+from rankings_parser import SNAPSHOT_HEADER
+
+MAIN_FILE = "atp_rankings.csv"
+LAST_UPDATED_FILE = "last_updated.txt"
+
+# Every published table is kept as an immutable file named by its hash;
+# current.json says which one is live and when it was updated. Kept out
+# of git: only this machine's dashboard reads them
+PUBLISH_DIR = "published"
+POINTER_FILE = os.path.join(PUBLISH_DIR, "current.json")
+
+# Older versions are pruned, the full history lives in history/snapshots
+KEEP_VERSIONS = 5
+
+
+def file_hash(path, chunk_size=1 << 16):
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+@contextmanager
+def atomic_path(path):
+    """
+    Yield a temp file name next to path to write the new content to. It is
+    renamed over path when the block completes and removed if it raises.
+
+    The name is unique per process and thread, so concurrent writers (the
+    scheduler and a manual --once run, or the scrape thread pool) never
+    share a temp file; the last rename wins.
+    """
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        yield tmp_path
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def write_atomic(path, data):
+    with atomic_path(path) as tmp_path:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(data)
+
+
+def copy_atomic(src, dst):
+    with atomic_path(dst) as tmp_path:
+        shutil.copyfile(src, tmp_path)
+
+
+def read_pointer(pointer_file=POINTER_FILE):
+    if not os.path.exists(pointer_file):
+        return None
+    with open(pointer_file, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def read_published(pointer_file=POINTER_FILE):
+    """
+    (path, last updated date) of the live rankings table.
+
+    The pointer is replaced in one rename and points at a file that never
+    changes, so the path and the date always belong together.
+    """
+    pointer = read_pointer(pointer_file)
+    if pointer:
+        return os.path.join(os.path.dirname(pointer_file), pointer["file"]), pointer["updated"]
+
+    # Not published through here yet
+    if os.path.exists(LAST_UPDATED_FILE):
+        with open(LAST_UPDATED_FILE, "r") as f:
+            return MAIN_FILE, f.read().strip()
+    return MAIN_FILE, "Unknown"
+
+
+def read_header(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        return next(csv.reader(f))
+
+
+def scraped_values(path, key):
+    """
+    [(key column, values of the scraped columns)] of a snapshot CSV, leaving
+    out Player ID and the columns derived after the scrape (movement)
+    """
+    with open(path, newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        columns = [header.index(c) for c in SNAPSHOT_HEADER[:-1] if c in header]
+        key_column = header.index(key)
+        return [(row[key_column], [row[i] for i in columns]) for row in reader]
+
+
+def diff_rows(old_file, new_file):
+    """
+    (rows in new_file, how many of them changed at the source since
+    old_file). Players are matched by Player ID, or by name when either
+    file is from before the registry.
+    """
+    old_exists = old_file is not None and os.path.exists(old_file)
+    headers = [read_header(new_file)] + ([read_header(old_file)] if old_exists else [])
+    key = "Player ID" if all("Player ID" in header for header in headers) else "Player Name"
+
+    old_rows = dict(scraped_values(old_file, key)) if old_exists else {}
+    new_rows = scraped_values(new_file, key)
+    changed = sum(old_rows.get(player) != values for player, values in new_rows)
+    return len(new_rows), changed
+
+
+def publish_snapshot(new_data_file, publish_dir=PUBLISH_DIR):
+    """
+    Make new_data_file the live rankings table unless it is identical to it.
+
+    Returns True when a new version was published. A no-change run only
+    hashes the new file.
+    """
+    pointer_file = os.path.join(publish_dir, "current.json")
+    pointer = read_pointer(pointer_file)
+    new_hash = file_hash(new_data_file)
+
+    if pointer:
+        old_hash = pointer["sha256"]
+        old_file = os.path.join(publish_dir, pointer["file"])
+    elif os.path.exists(MAIN_FILE):
+        old_hash = file_hash(MAIN_FILE)
+        old_file = MAIN_FILE
+    else:
+        old_hash = old_file = None
+
+    if new_hash == old_hash:
+        print("No changes in rankings, skipping update.", flush=True)
+        return False
+
+    rows, changed = diff_rows(old_file, new_data_file)
+    metrics.count("rows_changed", changed)
+
+    os.makedirs(publish_dir, exist_ok=True)
+    version_file = f"atp_rankings.{new_hash[:12]}.csv"
+    copy_atomic(new_data_file, os.path.join(publish_dir, version_file))
+
+    now = datetime.now()
+    write_atomic(pointer_file, json.dumps({
+        "file": version_file,
+        "sha256": new_hash,
+        "rows": rows,
+        "updated": now.strftime("%Y-%m-%d"),
+        "published_at": now.isoformat(timespec="seconds"),
+        "source": os.path.basename(new_data_file),
+    }, indent=2) + "\n")
+
+    # Plain copies for anything still reading the old file names
+    copy_atomic(new_data_file, MAIN_FILE)
+    write_atomic(LAST_UPDATED_FILE, now.strftime("%Y-%m-%d"))
+
+    prune_versions(publish_dir, keep=version_file)
+    print(f"Rankings published as {version_file}!", flush=True)
+    return True
+
+
+def prune_versions(publish_dir=PUBLISH_DIR, keep=None, keep_versions=KEEP_VERSIONS):
+    versions = sorted(
+        (name for name in os.listdir(publish_dir)
+         if name.startswith("atp_rankings.") and name.endswith(".csv") and name != keep),
+        key=lambda name: os.path.getmtime(os.path.join(publish_dir, name)),
+        reverse=True)
+    for name in versions[keep_versions - 1:]:
+        os.remove(os.path.join(publish_dir, name))
+        # Along with anything precomputed from it (aggregates.py)
+        for derived in glob.glob(os.path.join(publish_dir, f"{os.path.splitext(name)[0]}.*.json")):
+            os.remove(derived)
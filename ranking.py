@@ -1,24 +1,40 @@
-import shutil
+import copy
 import os
-import sys
-import csv
 import re
 import time
 import subprocess
 from datetime import datetime
 
-import pandas as pd
 import undetected_chromedriver as uc
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 
+import metrics
+from driver_manager import DriverManager
+from http_fetch import fetch_rankings_html, rankings_url
+from pipeline import store_snapshot
+from rankings_parser import InvalidRankings, take_valid, validated
+from scheduler import backoff_delay
+from scrape_jobs import MAIN_SOURCE
+from scrape_state import (RankingsUnchanged, check_table_hash, detect_changes, load_state,
+                          save_state, source_state)
+from snapshots import read_head, save_rankings_page, save_to_csv
+
 # Check and set the Chrome executable path for Nix environments
 chrome_path = "/Applications/Google Chrome.app/Contents/MacOS/Google Chrome"
 
 os.environ["CHROME_EXECUTABLE_PATH"] = chrome_path
 print(f"Using Chrome executable at: {chrome_path}")
 
+# "page_source" parses one HTML snapshot in-process, "cells" reads every
+# cell through WebDriver (thousands of round trips, kept as a fallback)
+PARSE_MODE = os.environ.get("PARSE_MODE", "page_source")
+
+# "http" tries a plain HTTP fetch first and only starts Chrome if the
+# response fails validation, "chrome" always uses the browser
+FETCH_ENGINE = os.environ.get("FETCH_ENGINE", "http")
+
 
 def setup_driver():
     chrome_options = uc.ChromeOptions()
@@ -41,12 +57,14 @@ def setup_driver():
         )
         return driver
     except Exception as e:
+        # Raise instead of exiting so the next attempt can relaunch Chrome
         print(f"Error initializing Chrome driver: {e}")
-        sys.exit(1)
+        raise
 
 
-# Use the driver
-driver = setup_driver()
+# One warm browser shared by every attempt in this process
+driver_manager = DriverManager(
+    setup_driver, chromedriver_path="/usr/local/bin/chromedriver")
 
 
 def is_properly_formatted_row(cells):
@@ -117,109 +135,67 @@ def extract_player_data(row):
         return None
 
 
-def save_to_csv(data, folder='atp_rankings_data'):
-    if not os.path.exists(folder):
-        os.makedirs(folder)
-
-    filename = f"{folder}/atp_rankings_{datetime.now().strftime('%Y-%m-%d')}.csv"
-
-    with open(filename, mode='w', newline='', encoding='utf-8') as file:
-        writer = csv.writer(file)
-        writer.writerow(["Rank", "Player Name", "Age",
-                        "Country", "Points", "Change"])
-        writer.writerows(data)
-
-    print(f"Data saved to {filename}")
-    return filename
-
-
-def extract_rankings():
-    url = 'https://live-tennis.eu/en/atp-live-ranking'
+def extract_rankings(state):
+    """
+    Scrape the ATP table and stream it into a dated snapshot.
+    Returns the snapshot filename, or None if nothing could be extracted.
+    Raises RankingsUnchanged as soon as a check shows nothing changed.
+    """
+    url = rankings_url()
     driver = None
 
+    if FETCH_ENGINE == "http":
+        print(f"Fetching {url} over HTTP...")
+        page = fetch_rankings_html(url, state)
+        if page:
+            html, new_state = page
+            try:
+                return save_rankings_page(html, state, new_state)
+            except InvalidRankings as e:
+                print(f"HTTP response failed validation: {e}")
+        print("Falling back to Chrome...")
+
     try:
         print("Initializing Chrome...")
-        driver = setup_driver()
+        driver = driver_manager.acquire()
 
         print(f"Navigating to {url}...")
-        driver.get(url)
+        with metrics.span("driver_get"):
+            driver.get(url)
 
         print("Waiting for page load...")
-        WebDriverWait(driver, 30).until(
-            EC.presence_of_element_located((By.CSS_SELECTOR, "table tbody tr")))
+        with metrics.span("webdriver_wait"):
+            WebDriverWait(driver, 30).until(
+                EC.presence_of_element_located((By.CSS_SELECTOR, "table tbody tr")))
+
+        if PARSE_MODE == "page_source":
+            html = driver.page_source
+            new_state = {"table_hash": check_table_hash(state, html)}
+            print("Parsing ranking rows from page source...")
+            return save_rankings_page(html, state, new_state)
 
         print("Finding ranking rows...")
         rows = driver.find_elements(By.CSS_SELECTOR, "table tbody tr")
 
         print(f"Found {len(rows)} potential rows")
 
-        data = []
-        found_first_valid = False
-        consecutive_invalid = 0
-        max_consecutive_invalid = 10  # Stop if we find too many invalid rows after valid ones
-
-        for row in rows:
-            player_data = extract_player_data(row)
+        # Stop if we find too many invalid rows after valid ones
+        player_rows = take_valid(rows, extract_player_data, max_consecutive_invalid=10)
 
-            if player_data:
-                found_first_valid = True
-                consecutive_invalid = 0
-                data.append(player_data)
-            elif found_first_valid:
-                consecutive_invalid += 1
-                if consecutive_invalid > max_consecutive_invalid:
-                    break
+        return save_to_csv(detect_changes(validated(player_rows), state))
 
-        # Sort by rank to ensure proper ordering
-        data.sort(key=lambda x: int(x[0]))
-
-        return data
+    except RankingsUnchanged:
+        raise
 
     except Exception as e:
         print(f"Error during scraping: {e}")
         if driver:
-            print("Current URL:", driver.current_url)
-        return []
-
-    finally:
-        if driver:
-            driver.quit()
-
-
-def update_main_rankings_file(new_data_file):
-    original_file = "atp_rankings.csv"
-
-    # Read old data if it exists
-    if os.path.exists(original_file):
-        df_old = pd.read_csv(original_file)
-    else:
-        df_old = None
-
-    # Read new data
-    df_new = pd.read_csv(new_data_file)
-
-    # Compare old and new data
-    if df_old is not None and df_old.equals(df_new):
-        print("No changes in rankings, skipping update.")
-        return original_file  # Exit without updating
-
-    # Backup old data before overwriting
-    date_str = datetime.now().strftime("%Y-%m-%d")
-    backup_file = f"atp_rankings_{date_str}.csv"
-
-    if os.path.exists(original_file):
-        shutil.copy(original_file, backup_file)
-        print(f"Backup created as {backup_file}")
-
-    # Overwrite with new data
-    df_new.to_csv(original_file, index=False)
-
-    # Record update time
-    with open("last_updated.txt", "w") as f:
-        f.write(datetime.now().strftime("%Y-%m-%d"))
-
-    print(f"Rankings updated in {original_file}!")
-    return original_file
+            try:
+                print("Current URL:", driver.current_url)
+            except Exception:
+                pass
+            driver_manager.discard()
+        return None
 
 
 def commit_to_git():
@@ -252,38 +228,62 @@ def commit_to_git():
         print(f"Git command failed: {e}")
 
 
-def main():
+def scrape_with_retries():
+    """
+    Scrape, publish and store the ATP table, retrying failed extractions.
+    Returns the run status for metrics: "changed", "unchanged" or "failed".
+    """
     print("Starting ATP rankings extraction...")
     max_attempts = 3
+    state = load_state()
+    singles_state = source_state(state, MAIN_SOURCE)
+    loaded_state = copy.deepcopy(state)
 
     for attempt in range(max_attempts):
         print(f"\nAttempt {attempt + 1} of {max_attempts}")
-        data = extract_rankings()
-
-        if data:
-            # Save the data to a date-specific file and get the filename
-            new_data_file = save_to_csv(data)
-
-            # Update the main rankings file
-            update_main_rankings_file(new_data_file)
+        try:
+            new_data_file = extract_rankings(singles_state)
+        except RankingsUnchanged as e:
+            print(f"Rankings unchanged since last run ({e}), nothing to do.")
+            # Keep new HTTP validators so the next run can get a 304, but
+            # leave the file alone when nothing about the source changed
+            if state != loaded_state:
+                save_state(state)
+            return "unchanged"
+
+        if new_data_file:
+            # Publish the main rankings file and add it to every history
+            store_snapshot(new_data_file)
+            save_state(state)
 
-            print(f"Successfully extracted {len(data)} player rankings.")
             # Print first few entries to verify format
             print("\nFirst few entries:")
-            for entry in data[:5]:
+            for entry in read_head(new_data_file):
                 print(entry)
 
             # Commit changes to Git
-            commit_to_git()
-            break
+            with metrics.span("commit_to_git"):
+                commit_to_git()
+            return "changed"
         else:
             print(f"No data extracted on attempt {attempt + 1}")
             if attempt < max_attempts - 1:
-                wait_time = 10 * (attempt + 1)
-                print(f"Waiting {wait_time} seconds before retry...")
+                wait_time = backoff_delay(attempt)
+                print(f"Waiting {wait_time:.0f} seconds before retry...")
                 time.sleep(wait_time)
-    else:
-        print("Failed to extract data after all attempts.")
+
+    print("Failed to extract data after all attempts.")
+    return "failed"
+
+
+def main():
+    metrics.start_run()
+    status = "error"
+    try:
+        status = scrape_with_retries()
+    finally:
+        record = metrics.finish_run(status)
+        print(f"Run metrics: {record}")
 
 
 if __name__ == "__main__":
@@ -1,17 +1,17 @@
-import shutil
+import copy
 import os
 import sys
-import csv
-import re
-import time
 import subprocess
 from datetime import datetime
 
-import pandas as pd
 import undetected_chromedriver as uc
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
+
+import metrics
+from driver_manager import DriverManager
+from pipeline import store_snapshot
+from scheduler import run_daemon
+from scrape_jobs import FAILED, MAIN_SOURCE, UNCHANGED, load_jobs, scrape_jobs
+from scrape_state import load_state, save_state
 
 print("Script has started...", flush=True)
 
@@ -22,6 +22,10 @@ chromedriver_path = "/usr/local/bin/chromedriver"
 os.environ["CHROME_EXECUTABLE_PATH"] = chrome_path
 print(f"Using Chrome executable at: {chrome_path}", flush=True)
 
+# "http" tries a plain HTTP fetch first and only starts Chrome if the
+# response fails validation, "chrome" always uses the browser
+FETCH_ENGINE = os.environ.get("FETCH_ENGINE", "http")
+
 print("Starting ATP rankings extraction on Railway...", flush=True)
 
 
@@ -44,119 +48,13 @@ def setup_driver():
         )
         return driver
     except Exception as e:
+        # Raise instead of exiting so a resident scheduler survives a bad launch
         print(f"Error initializing Chrome driver: {e}", flush=True)
-        sys.exit(1)
+        raise
 
 
-def is_properly_formatted_row(cells):
-    if len(cells) < 7:
-        return False
-    try:
-        rank = cells[0].text.strip()
-        if not rank.isdigit():
-            return False
-        name = cells[3].text.strip()
-        if len(name.split()) < 2:
-            return False
-        age = cells[4].text.strip()
-        if not age.isdigit():
-            return False
-        country = cells[5].text.strip()
-        if not (len(country) == 3 and country.isalpha() and country.isupper()):
-            return False
-        points = cells[6].text.strip()
-        if not points.replace(",", "").isdigit():
-            return False
-        return True
-    except Exception:
-        return False
-
-
-def extract_player_data(row):
-    try:
-        cells = row.find_elements(By.TAG_NAME, "td")
-        if not is_properly_formatted_row(cells):
-            return None
-        rank = cells[0].text.strip()
-        name = cells[3].text.strip()
-        age = cells[4].text.strip()
-        country = cells[5].text.strip()
-        points = cells[6].text.strip()
-        change = ""
-        if len(cells) > 7:
-            change_text = cells[7].text.strip()
-            change_match = re.search(r'[+-]\d+', change_text)
-            if change_match:
-                change = change_match.group(0)
-        return [rank, name, age, country, points, change]
-    except Exception as e:
-        print(f"Error extracting player data: {e}", flush=True)
-        return None
-
-
-def save_to_csv(data, folder='atp_rankings_data'):
-    if not os.path.exists(folder):
-        os.makedirs(folder)
-    filename = f"{folder}/atp_rankings_{datetime.now().strftime('%Y-%m-%d')}.csv"
-    with open(filename, mode='w', newline='', encoding='utf-8') as file:
-        writer = csv.writer(file)
-        writer.writerow(["Rank", "Player Name", "Age",
-                        "Country", "Points", "Change"])
-        writer.writerows(data)
-    print(f"Data saved to {filename}", flush=True)
-    return filename
-
-
-def extract_rankings():
-    url = 'https://live-tennis.eu/en/atp-live-ranking'
-    driver = None
-    try:
-        print("Initializing Chrome in Railway...", flush=True)
-        driver = setup_driver()
-        print(f"Navigating to {url}...", flush=True)
-        driver.get(url)
-        time.sleep(3)  # Added delay to help with page load/bot detection
-        print("Waiting for page load...", flush=True)
-        WebDriverWait(driver, 30).until(
-            EC.presence_of_element_located((By.CSS_SELECTOR, "table tbody tr"))
-        )
-        print("Finding ranking rows...", flush=True)
-        rows = driver.find_elements(By.CSS_SELECTOR, "table tbody tr")
-        print(f"Found {len(rows)} potential rows", flush=True)
-        data = []
-        for row in rows:
-            player_data = extract_player_data(row)
-            if player_data:
-                data.append(player_data)
-        return data
-    except Exception as e:
-        print(f"Error during scraping: {e}", flush=True)
-        return []
-    finally:
-        if driver:
-            driver.quit()
-
-
-def update_main_rankings_file(new_data_file):
-    original_file = "atp_rankings.csv"
-    if os.path.exists(original_file):
-        df_old = pd.read_csv(original_file)
-    else:
-        df_old = None
-    df_new = pd.read_csv(new_data_file)
-    if df_old is not None and df_old.equals(df_new):
-        print("No changes in rankings, skipping update.", flush=True)
-        return original_file
-    date_str = datetime.now().strftime("%Y-%m-%d")
-    backup_file = f"atp_rankings_{date_str}.csv"
-    if os.path.exists(original_file):
-        shutil.copy(original_file, backup_file)
-        print(f"Backup created as {backup_file}", flush=True)
-    df_new.to_csv(original_file, index=False)
-    with open("last_updated.txt", "w") as f:
-        f.write(datetime.now().strftime("%Y-%m-%d"))
-    print(f"Rankings updated in {original_file}!", flush=True)
-    return original_file
+# One warm browser shared by every scrape in this process, one tab per source
+driver_manager = DriverManager(setup_driver, chromedriver_path=chromedriver_path)
 
 
 def commit_to_git():
@@ -184,24 +82,57 @@ def commit_to_git():
         print(f"Git command failed: {e}", flush=True)
 
 
-def main():
+def run_once():
+    """
+    One scrape of every source in scrape_jobs.json. Returns True on success
+    or when nothing changed, False when the main ATP table could not be
+    extracted and the run should be retried.
+    """
+    print("Starting ATP rankings extraction on Railway...", flush=True)
+    metrics.start_run()
+    status = "error"
     try:
-        print("Starting ATP rankings extraction on Railway...", flush=True)
-        data = extract_rankings()
-        if data:
-            print(
-                f"Successfully extracted {len(data)} player rankings.", flush=True)
-            new_data_file = save_to_csv(data)
-            update_main_rankings_file(new_data_file)
-            commit_to_git()
-        else:
-            print("No data extracted.", flush=True)
-    except Exception as e:
-        print(f"Unhandled error: {e}", flush=True)
+        state = load_state()
+        loaded_state = copy.deepcopy(state)
+        results = scrape_jobs(load_jobs(), state, driver_manager, engine=FETCH_ENGINE)
+        changed = False
+        main_ok = True
+        for job, job_status, new_data_file in results:
+            name = job["name"]
+            if job_status == UNCHANGED:
+                print(f"{name}: rankings unchanged since last run.", flush=True)
+            elif job_status == FAILED:
+                print(f"{name}: no data extracted.", flush=True)
+                if name == MAIN_SOURCE:
+                    main_ok = False
+            else:
+                # Only the main source feeds atp_rankings.csv and the dashboard
+                store_snapshot(new_data_file, main=name == MAIN_SOURCE, name=name)
+                changed = True
+        # Unchanged sources may have new HTTP validators to keep as well;
+        # a run where no source state changed writes nothing
+        if state != loaded_state:
+            save_state(state)
+        if changed:
+            with metrics.span("commit_to_git"):
+                commit_to_git()
+        status = "failed" if not main_ok else "changed" if changed else "unchanged"
+        return main_ok
     finally:
-        # Keep container alive for debugging to review logs
-        print("Exiting script, sleeping for 300 seconds for debugging...", flush=True)
-        time.sleep(300)
+        record = metrics.finish_run(status)
+        print(f"Run metrics: {record}", flush=True)
+
+
+def main():
+    if "--once" in sys.argv:
+        try:
+            run_once()
+        except Exception as e:
+            print(f"Unhandled error: {e}", flush=True)
+        return
+
+    # Stay resident: scrape on a cadence and serve /healthz for Railway
+    run_daemon(run_once)
 
 
 if __name__ == "__main__":
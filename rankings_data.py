@@ -0,0 +1,41 @@
+import pandas as pd
+
+# Older exports used different headers for the same columns
+COLUMN_ALIASES = {"Player": "Player Name", "Nationality": "Country", "Pts": "Points"}
+
+
+def compact(df):
+    """
+    Downcast a rankings frame in place: int16 rank and age, int32 points,
+    nullable int16 change, categorical country and Arrow-backed names
+    """
+    df["Rank"] = df["Rank"].astype("int16")
+    # Nullable only when some ages are missing, plotting prefers plain ints
+    df["Age"] = df["Age"].astype("int16" if df["Age"].notna().all() else "Int16")
+    df["Points"] = df["Points"].astype("int32")
+    # A player climbing from outside the top 1000 moves more than int8 allows
+    df["Change"] = df["Change"].astype("Int16")
+    # Categories in order of first appearance, so value_counts() breaks
+    # ties the same way it does on plain strings
+    country = df["Country"].astype(str)
+    df["Country"] = pd.Categorical(country, categories=pd.unique(country))
+    df["Player Name"] = df["Player Name"].astype("string[pyarrow]")
+    for column in df.columns:
+        if column.startswith("Rank Delta"):
+            df[column] = df[column].astype("Int16")
+        elif column.startswith("Points Delta"):
+            df[column] = df[column].astype("Int32")
+    if "Player ID" in df.columns:
+        df["Player ID"] = df["Player ID"].astype("int32" if df["Player ID"].notna().all() else "Int32")
+    return df
+
+
+def load_rankings(path="atp_rankings.csv"):
+    """
+    Read a snapshot CSV (any of our formats) into a compact typed frame
+    """
+    df = pd.read_csv(path, thousands=",")
+    df = df.rename(columns=COLUMN_ALIASES)
+    if "Change" not in df.columns:
+        df["Change"] = pd.NA
+    return compact(df)
@@ -0,0 +1,160 @@
+import io
+import os
+import re
+
+from lxml import etree
+
+import metrics
+
+# A real ranking page lists hundreds of players; anything less is a block page
+MIN_VALID_ROWS = int(os.environ.get("MIN_VALID_ROWS", "100"))
+
+# Columns of a saved snapshot: what parse_ranking_row() returns plus the
+# registry ID. Player ID comes last so older six-column snapshots keep the
+# same positions; anything after it is derived (movement.py).
+SNAPSHOT_HEADER = ["Rank", "Player Name", "Age", "Country", "Points", "Change", "Player ID"]
+
+# Same as lxml.html's text_content(): all descendant text, no comments
+cell_text = etree.XPath("string()")
+
+
+class InvalidRankings(Exception):
+    """
+    The page parsed, but it does not look like a full ranking table
+    """
+
+
+def clean_text(text):
+    """
+    Collapse whitespace the way WebElement.text does for a table cell
+    """
+    return " ".join(text.split())
+
+
+def is_valid_ranking_row(texts):
+    """
+    Same rules as is_properly_formatted_row(), applied to plain cell texts
+    """
+    if len(texts) < 7:
+        return False
+
+    # Check rank format (should be just a number)
+    if not texts[0].isdigit():
+        return False
+
+    # Check name format (should be two or more words)
+    if len(texts[3].split()) < 2:
+        return False
+
+    # Check age (should be just a number)
+    if not texts[4].isdigit():
+        return False
+
+    # Check country code (should be 3 uppercase letters)
+    country = texts[5]
+    if not (len(country) == 3 and country.isalpha() and country.isupper()):
+        return False
+
+    # Check points (should be a number without text)
+    if not texts[6].replace(",", "").isdigit():
+        return False
+
+    return True
+
+
+def parse_ranking_row(texts):
+    """
+    Turn the cell texts of one table row into a ranking entry, or None
+    """
+    if not is_valid_ranking_row(texts):
+        return None
+
+    change = ""
+    if len(texts) > 7:
+        change_match = re.search(r'[+-]\d+', texts[7])
+        if change_match:
+            change = change_match.group(0)
+
+    return [texts[0], texts[3], texts[4], texts[5], texts[6], change]
+
+
+def iter_row_texts(html):
+    """
+    Yield the cleaned <td> texts of every table row in an HTML document.
+
+    Rows are parsed incrementally and dropped from the tree once read, so
+    memory does not grow with the number of rows. A document lxml can't
+    parse at all (an empty body, say) raises InvalidRankings.
+    """
+    # Browsers insert <tbody> into page_source, raw HTML may not have it
+    rows = etree.iterparse(io.BytesIO(html.encode("utf-8")), events=("end",),
+                           tag="tr", html=True, encoding="utf-8")
+    while True:
+        try:
+            _, row = next(rows)
+        except StopIteration:
+            return
+        except etree.LxmlError as e:
+            raise InvalidRankings(f"page could not be parsed: {e}") from e
+
+        yield [clean_text(cell_text(cell)) for cell in row.iterchildren("td")]
+
+        row.clear(keep_tail=True)
+        parent = row.getparent()
+        while row.getprevious() is not None:
+            del parent[0]
+
+
+def take_valid(items, parse, max_consecutive_invalid=10):
+    """
+    Yield parse(item) for every item that parses, stopping once more than
+    max_consecutive_invalid items in a row fail after the first valid one.
+    Every item that fails counts as rejected, header rows before the table
+    included.
+    """
+    found_first_valid = False
+    consecutive_invalid = 0
+
+    for item in items:
+        player_data = parse(item)
+
+        if player_data:
+            found_first_valid = True
+            consecutive_invalid = 0
+            metrics.count("rows_parsed")
+            yield player_data
+            continue
+
+        metrics.count("rows_rejected")
+        if found_first_valid and max_consecutive_invalid is not None:
+            consecutive_invalid += 1
+            if consecutive_invalid > max_consecutive_invalid:
+                break
+
+
+def parse_rankings_html(html, max_consecutive_invalid=10):
+    """
+    Lazily parse the ranking rows out of one page snapshot
+    """
+    return take_valid(iter_row_texts(html), parse_ranking_row, max_consecutive_invalid)
+
+
+def validated(rows, min_rows=MIN_VALID_ROWS):
+    """
+    Pass rows through, raising InvalidRankings at the end if they don't
+    form a full table starting at rank 1
+    """
+    count = 0
+    top_rank = None
+
+    for row in rows:
+        rank = int(row[0])
+        if top_rank is None or rank < top_rank:
+            top_rank = rank
+        count += 1
+        yield row
+
+    if count < min_rows:
+        raise InvalidRankings(f"only {count} valid rows")
+    if top_rank != 1:
+        raise InvalidRankings(f"table starts at rank {top_rank}")
@@ -0,0 +1,190 @@
+import asyncio
+import fcntl
+import json
+import os
+import random
+import time
+from datetime import date, datetime
+
+# Seconds between scrapes, tighter while a tournament is being played
+SCRAPE_INTERVAL = int(os.environ.get("SCRAPE_INTERVAL", str(6 * 3600)))
+TOURNAMENT_INTERVAL = int(os.environ.get("TOURNAMENT_INTERVAL", str(30 * 60)))
+
+# Comma-separated date ranges, e.g. "2025-03-05:2025-03-16,2025-03-19:2025-03-30"
+TOURNAMENT_WEEKS = os.environ.get("TOURNAMENT_WEEKS", "")
+
+# Railway passes the port its health check probes in PORT
+HEALTH_PORT = int(os.environ.get("PORT", "8080"))
+
+# /healthz reports unhealthy after this many failed scrapes in a row
+MAX_CONSECUTIVE_FAILURES = int(os.environ.get("MAX_CONSECUTIVE_FAILURES", "5"))
+
+LOCK_FILE = "scrape.lock"
+
+
+def backoff_delay(attempt, base=10, cap=600):
+    """
+    Exponential backoff with jitter: half the delay is fixed, half random
+    """
+    delay = min(cap, base * 2 ** attempt)
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+def parse_tournament_weeks(spec):
+    ranges = []
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        start, _, end = part.partition(":")
+        ranges.append((date.fromisoformat(start), date.fromisoformat(end or start)))
+    return ranges
+
+
+def in_tournament_week(day, ranges):
+    return any(start <= day <= end for start, end in ranges)
+
+
+class Scheduler:
+    """
+    Run a blocking scrape job on a fixed cadence inside one resident process.
+
+    The job returns True when the run succeeded (including "nothing
+    changed") and False when it should be retried with backoff. Only one
+    run can be in flight: an in-process lock guards against overlapping
+    triggers and a file lock against a second scraper process.
+    """
+
+    def __init__(self, job, interval=SCRAPE_INTERVAL, tournament_interval=TOURNAMENT_INTERVAL,
+                 tournament_weeks=TOURNAMENT_WEEKS, lock_file=LOCK_FILE):
+        self.job = job
+        self.interval = interval
+        self.tournament_interval = tournament_interval
+        self.tournament_weeks = parse_tournament_weeks(tournament_weeks)
+        self.lock_file = lock_file
+        self.lock = asyncio.Lock()
+        self.started_at = time.time()
+        self.last_run = None
+        self.last_success = None
+        self.last_duration = None
+        self.consecutive_failures = 0
+        self.skipped_overlaps = 0
+        self.next_run = None
+
+    def current_interval(self):
+        if in_tournament_week(date.today(), self.tournament_weeks):
+            return self.tournament_interval
+        return self.interval
+
+    def next_delay(self, ok):
+        interval = self.current_interval()
+        if not ok:
+            return min(backoff_delay(self.consecutive_failures - 1), interval)
+        # Small jitter so we don't hit the source at exactly the same second every time
+        return interval * random.uniform(0.95, 1.05)
+
+    def _run_job_locked(self):
+        with open(self.lock_file, "w") as lock:
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                print("Another scraper process holds the lock, skipping run.", flush=True)
+                return None
+            try:
+                return self.job()
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    async def run_once(self):
+        if self.lock.locked():
+            self.skipped_overlaps += 1
+            print("Previous scrape still running, skipping this trigger.", flush=True)
+            return None
+
+        async with self.lock:
+            self.last_run = time.time()
+            try:
+                ok = await asyncio.to_thread(self._run_job_locked)
+            except Exception as e:
+                print(f"Unhandled error in scrape job: {e}", flush=True)
+                ok = False
+            self.last_duration = time.time() - self.last_run
+
+        if ok is None:
+            return None
+        if ok:
+            self.last_success = time.time()
+            self.consecutive_failures = 0
+        else:
+            self.consecutive_failures += 1
+        return ok
+
+    async def run_forever(self):
+        while True:
+            ok = await self.run_once()
+            # A skipped run (lock held elsewhere) waits a regular interval
+            delay = self.next_delay(ok is not False)
+            self.next_run = time.time() + delay
+            print(f"Next scrape in {delay:.0f} seconds", flush=True)
+            await asyncio.sleep(delay)
+
+    def health(self):
+        def iso(ts):
+            return datetime.fromtimestamp(ts).isoformat(timespec="seconds") if ts else None
+
+        return {
+            "status": "ok" if self.consecutive_failures < MAX_CONSECUTIVE_FAILURES else "failing",
+            "running": self.lock.locked(),
+            "started_at": iso(self.started_at),
+            "last_run": iso(self.last_run),
+            "last_success": iso(self.last_success),
+            "last_duration": self.last_duration,
+            "next_run": iso(self.next_run),
+            "consecutive_failures": self.consecutive_failures,
+            "skipped_overlaps": self.skipped_overlaps,
+            "interval": self.current_interval(),
+        }
+
+
+async def handle_health_request(scheduler, reader, writer):
+    try:
+        request_line = await reader.readline()
+        # Drain the headers, we don't need them
+        while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+            pass
+
+        parts = request_line.decode("latin-1").split()
+        path = parts[1] if len(parts) > 1 else "/"
+        if path.split("?")[0] in ("/healthz", "/"):
+            health = scheduler.health()
+            status = "200 OK" if health["status"] == "ok" else "503 Service Unavailable"
+            body = json.dumps(health).encode("utf-8")
+        else:
+            status = "404 Not Found"
+            body = b'{"error": "not found"}'
+
+        writer.write(
+            f"HTTP/1.1 {status}\r\n"
+            "Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            "Connection: close\r\n\r\n".encode("latin-1") + body
+        )
+        await writer.drain()
+    finally:
+        writer.close()
+
+
+async def serve(job, port=HEALTH_PORT):
+    """
+    Run the scheduler and the /healthz endpoint until the process is stopped
+    """
+    scheduler = Scheduler(job)
+    server = await asyncio.start_server(
+        lambda r, w: handle_health_request(scheduler, r, w), "0.0.0.0", port)
+    print(f"Health endpoint listening on :{port}/healthz", flush=True)
+    async with server:
+        await scheduler.run_forever()
+
+
+def run_daemon(job, port=HEALTH_PORT):
+    asyncio.run(serve(job, port))
@@ -0,0 +1,154 @@
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.ui import WebDriverWait
+
+import metrics
+from http_fetch import fetch_rankings_html, rankings_url
+from rankings_parser import InvalidRankings
+from scrape_state import RankingsUnchanged, check_table_hash, source_state
+from snapshots import save_rankings_page
+
+JOBS_FILE = "scrape_jobs.json"
+
+# The source that feeds atp_rankings.csv and the dashboard
+MAIN_SOURCE = "atp_singles"
+
+# Outcome of scraping one source
+SAVED = "saved"
+UNCHANGED = "unchanged"
+FAILED = "failed"
+
+DEFAULT_JOBS = [
+    {"name": MAIN_SOURCE, "path": "/en/atp-live-ranking",
+     "prefix": "atp_rankings", "folder": "atp_rankings_data"},
+]
+
+
+def load_jobs(path=JOBS_FILE):
+    """
+    Read the list of ranking tables to scrape; falls back to ATP singles only
+    """
+    if not os.path.exists(path):
+        return DEFAULT_JOBS
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)["sources"]
+
+
+def save_source_page(job, state, html, new_state):
+    """
+    Parse and save one fetched page; returns (status, filename)
+    """
+    name = job["name"]
+    try:
+        filename = save_rankings_page(
+            html, source_state(state, name), new_state,
+            folder=job.get("folder", "atp_rankings_data"), prefix=job["prefix"])
+        return SAVED, filename
+    except RankingsUnchanged as e:
+        print(f"{name}: {e}", flush=True)
+        return UNCHANGED, None
+    except InvalidRankings as e:
+        print(f"{name}: page failed validation ({e})", flush=True)
+        return FAILED, None
+
+
+def scrape_http(job, state):
+    try:
+        page = fetch_rankings_html(rankings_url(job["path"]), source_state(state, job["name"]))
+    except RankingsUnchanged as e:
+        print(f"{job['name']}: {e}", flush=True)
+        return UNCHANGED, None
+    if page is None:
+        return FAILED, None
+    html, new_state = page
+    return save_source_page(job, state, html, new_state)
+
+
+def fetch_all_http(jobs, state, max_workers=4):
+    """
+    Fetch, parse and save every source concurrently through the pooled HTTP session
+    """
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        results = pool.map(lambda job: scrape_http(job, state), jobs)
+        return {job["name"]: result for job, result in zip(jobs, results)}
+
+
+def fetch_all_in_tabs(driver, jobs, state, timeout=30):
+    """
+    Load every source in its own tab of one browser, then parse each tab.
+
+    window.open() returns immediately, so the pages load in parallel and
+    the total wait is roughly that of the slowest page.
+    """
+    results = {}
+    main_handle = driver.current_window_handle
+    handles = {}
+
+    with metrics.span("driver_get"):
+        for job in jobs:
+            before = set(driver.window_handles)
+            driver.execute_script("window.open(arguments[0], '_blank');", rankings_url(job["path"]))
+            handles[job["name"]] = (set(driver.window_handles) - before).pop()
+
+    with metrics.span("page_load_sleep"):
+        time.sleep(3)  # Added delay to help with page load/bot detection
+
+    try:
+        for job in jobs:
+            name = job["name"]
+            driver.switch_to.window(handles[name])
+            try:
+                with metrics.span("webdriver_wait"):
+                    WebDriverWait(driver, timeout).until(
+                        EC.presence_of_element_located((By.CSS_SELECTOR, "table tbody tr")))
+            except Exception as e:
+                print(f"{name}: table did not load in Chrome: {e}", flush=True)
+                results[name] = (FAILED, None)
+                continue
+
+            html = driver.page_source
+            try:
+                new_state = {"table_hash": check_table_hash(source_state(state, name), html)}
+            except RankingsUnchanged as e:
+                print(f"{name}: {e}", flush=True)
+                results[name] = (UNCHANGED, None)
+                continue
+            results[name] = save_source_page(job, state, html, new_state)
+    finally:
+        for handle in handles.values():
+            try:
+                driver.switch_to.window(handle)
+                driver.close()
+            except Exception:
+                pass
+        driver.switch_to.window(main_handle)
+
+    return results
+
+
+def scrape_jobs(jobs, state, driver_manager=None, engine="http", max_workers=4):
+    """
+    Scrape and save every job. Returns [(job, status, filename)] in job
+    order, where status is SAVED, UNCHANGED or FAILED. Sources that fail
+    over HTTP are retried together in one Chrome.
+    """
+    results = {}
+    if engine == "http":
+        print(f"Fetching {len(jobs)} sources over HTTP...", flush=True)
+        results = fetch_all_http(jobs, state, max_workers)
+
+    pending = [job for job in jobs if results.get(job["name"], (FAILED,))[0] == FAILED]
+    if pending and driver_manager is not None:
+        print(f"Loading {len(pending)} sources in Chrome tabs...", flush=True)
+        try:
+            results.update(fetch_all_in_tabs(driver_manager.acquire(), pending, state))
+        except Exception as e:
+            print(f"Error during scraping: {e}", flush=True)
+            driver_manager.discard()
+
+    return [(job, *results.get(job["name"], (FAILED, None))) for job in jobs]
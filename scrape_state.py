@@ -0,0 +1,90 @@
+import hashlib
+import json
+import os
+from datetime import datetime
+
+from publish import write_atomic
+
+STATE_FILE = "scrape_state.json"
+
+
+class RankingsUnchanged(Exception):
+    """
+    Raised as soon as a check shows the source matches the last published scrape
+    """
+
+
+def load_state(path=STATE_FILE):
+    """
+    Load what we know about the last published scrape: HTTP validators and content hashes
+    """
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Ignoring unreadable state file {path}: {e}", flush=True)
+        return {}
+
+
+def save_state(state, path=STATE_FILE):
+    state["updated_at"] = datetime.now().isoformat(timespec="seconds")
+    write_atomic(path, json.dumps(state, indent=2, sort_keys=True))
+
+
+def source_state(state, name):
+    """
+    Return the part of the state that belongs to one scraped source
+    """
+    return state.setdefault("sources", {}).setdefault(name, {})
+
+
+def conditional_headers(state):
+    headers = {}
+    if state.get("etag"):
+        headers["If-None-Match"] = state["etag"]
+    if state.get("last_modified"):
+        headers["If-Modified-Since"] = state["last_modified"]
+    return headers
+
+
+def table_hash(html):
+    """
+    Hash only the table markup, so ads and timestamps around it don't count as changes
+    """
+    start = html.find("<table")
+    end = html.rfind("</table>")
+    if start == -1 or end == -1:
+        section = html
+    else:
+        section = html[start:end]
+    return hashlib.sha256(section.encode("utf-8")).hexdigest()
+
+
+def check_table_hash(state, html):
+    """
+    Raise RankingsUnchanged if the table markup matches the last published
+    page, otherwise return its hash to be stored once the scrape succeeds
+    """
+    html_hash = table_hash(html)
+    if state.get("table_hash") == html_hash:
+        raise RankingsUnchanged("ranking table HTML unchanged")
+    return html_hash
+
+
+def detect_changes(rows, state):
+    """
+    Pass rows through while hashing them, raising RankingsUnchanged at the
+    end if they match the last published ones
+    """
+    digest = hashlib.sha256()
+    for row in rows:
+        digest.update("\x1f".join(row).encode("utf-8"))
+        digest.update(b"\n")
+        yield row
+
+    new_hash = digest.hexdigest()
+    if state.get("rows_hash") == new_hash:
+        raise RankingsUnchanged("parsed rows unchanged")
+    state["rows_hash"] = new_hash
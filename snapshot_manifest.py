@@ -0,0 +1,186 @@
+"""
+Content-addressed manifest of every ATP singles snapshot we hold
+
+Usage:
+    python snapshot_manifest.py [FILES...] [--workers 4] [--rehash] [--import]
+
+With no FILES it scans the usual places: atp_rankings_data/, the dated
+backups at the repo root and the older rank_atp*.csv exports. Each file
+is hashed twice, raw bytes and parsed content (so "11,330" and 11330 are
+the same snapshot), in a process pool. Files already in the manifest
+with the same size and raw hash are not parsed again. Nothing local like
+mtimes goes into the manifest, so a fresh clone skips them too.
+
+The manifest (history/manifest.json) maps every file to its hashes and
+row count, every distinct content to one canonical file, and every date
+to a content hash. Files with too few rows or a table not starting at
+rank 1 are flagged partial and never chosen as canonical. --import feeds
+newly seen canonical snapshots into the history stores.
+"""
+import argparse
+import glob
+import hashlib
+import json
+import os
+import statistics
+from concurrent.futures import ProcessPoolExecutor
+
+from delta_store import add_snapshot
+from history_db import load_snapshot
+from history_store import ingest_snapshot
+from publish import file_hash, write_atomic
+from rankings_data import load_rankings
+from snapshots import parse_snapshot_name
+
+MANIFEST_FILE = os.path.join("history", "manifest.json")
+
+CANDIDATES = ["atp_rankings_data/atp_rankings_*.csv", "atp_rankings_*.csv", "rank_atp*.csv"]
+
+CONTENT_COLUMNS = ["Rank", "Player Name", "Age", "Country", "Points", "Change"]
+
+# A snapshot with fewer rows than this share of the usual count was cut short
+PARTIAL_RATIO = 0.9
+
+
+def scan_file(path):
+    """
+    Hashes and shape of one candidate file (runs in a worker process)
+    """
+    entry = {"size": os.path.getsize(path), "sha256": file_hash(path)}
+    try:
+        df = load_rankings(path)[CONTENT_COLUMNS]
+    except Exception as e:
+        entry.update(content=None, rows=0, top_rank=None, error=str(e))
+        return entry
+
+    content = df.to_csv(index=False, lineterminator="\n").encode("utf-8")
+    entry.update(content=hashlib.sha256(content).hexdigest(), rows=len(df),
+                 top_rank=int(df["Rank"].min()) if len(df) else None)
+    return entry
+
+
+def canonical_order(path):
+    """
+    Sort key for picking the canonical copy: save_to_csv() output in the
+    data folder first, then other dated files, then undated ones
+    """
+    in_data_folder = os.path.dirname(path).endswith("_data")
+    _, day = parse_snapshot_name(path)
+    return (not in_data_folder, day is None, str(day), path)
+
+
+def build_index(files):
+    """
+    Flag partial files and group the rest by content
+    """
+    full_sizes = [entry["rows"] for entry in files.values() if entry["content"]]
+    usual_rows = statistics.median(full_sizes) if full_sizes else 0
+
+    for path, entry in files.items():
+        if entry["content"] is None:
+            entry["partial"] = f"unreadable: {entry.get('error')}"
+        elif entry["rows"] < PARTIAL_RATIO * usual_rows:
+            entry["partial"] = f"{entry['rows']} rows, usually {usual_rows:.0f}"
+        elif entry["top_rank"] != 1:
+            entry["partial"] = f"table starts at rank {entry['top_rank']}"
+        else:
+            entry["partial"] = None
+
+    snapshots = {}
+    for path in sorted(files, key=canonical_order):
+        entry = files[path]
+        if entry["partial"]:
+            continue
+        snapshot = snapshots.setdefault(entry["content"], {
+            "canonical": path, "rows": entry["rows"], "copies": []})
+        if path != snapshot["canonical"]:
+            snapshot["copies"].append(path)
+
+    dates = {}
+    for content, snapshot in snapshots.items():
+        _, day = parse_snapshot_name(snapshot["canonical"])
+        snapshot["date"] = str(day) if day else None
+        if day and str(day) not in dates:
+            dates[str(day)] = content
+
+    return snapshots, dict(sorted(dates.items()))
+
+
+def load_manifest(path=MANIFEST_FILE):
+    if not os.path.exists(path):
+        return {"files": {}, "snapshots": {}, "dates": {}}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_manifest(manifest, path=MANIFEST_FILE):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    write_atomic(path, json.dumps(manifest, indent=1, sort_keys=True))
+
+
+def update_manifest(paths, manifest, workers=None, rehash=False):
+    """
+    Scan new or modified files in parallel and rebuild the indexes.
+    Returns the paths that were (re)scanned.
+    """
+    files = manifest["files"]
+    todo = []
+    for path in paths:
+        known = files.get(path)
+        # Hashing the bytes is cheap next to parsing them
+        if (rehash or not known or known["size"] != os.path.getsize(path)
+                or known["sha256"] != file_hash(path)):
+            todo.append(path)
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for path, entry in zip(todo, pool.map(scan_file, todo)):
+            files[path] = entry
+
+    # Forget files that have been deleted since the last run
+    for path in [p for p in files if not os.path.exists(p)]:
+        del files[path]
+
+    manifest["snapshots"], manifest["dates"] = build_index(files)
+    return todo
+
+
+def import_dates(manifest, dates):
+    for day in dates:
+        path = manifest["snapshots"][manifest["dates"][day]]["canonical"]
+        kind = add_snapshot(path, source="atp_rankings")
+        ingest_snapshot(path, source="atp_rankings")
+        load_snapshot(path, source="atp_rankings")
+        print(f"{day}: imported {path} ({kind})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("files", nargs="*")
+    parser.add_argument("--workers", type=int, help="worker processes (default: one per CPU)")
+    parser.add_argument("--rehash", action="store_true", help="scan every file again")
+    parser.add_argument("--import", dest="import_", action="store_true",
+                        help="add newly seen dates to the history stores")
+    args = parser.parse_args()
+
+    paths = args.files or sorted({p for pattern in CANDIDATES for p in glob.glob(pattern)})
+    manifest = load_manifest()
+    known_dates = set(manifest["dates"])
+
+    scanned = update_manifest(paths, manifest, args.workers, args.rehash)
+    save_manifest(manifest)
+
+    print(f"Scanned {len(scanned)} of {len(paths)} files, "
+          f"{len(manifest['snapshots'])} distinct snapshots over {len(manifest['dates'])} dates")
+    for path, entry in sorted(manifest["files"].items()):
+        if entry["partial"]:
+            print(f"  partial: {path} ({entry['partial']})")
+    for snapshot in manifest["snapshots"].values():
+        if snapshot["copies"]:
+            print(f"  {snapshot['canonical']} also at {', '.join(snapshot['copies'])}")
+
+    if args.import_:
+        import_dates(manifest, sorted(set(manifest["dates"]) - known_dates))
+
+
+if __name__ == "__main__":
+    main()
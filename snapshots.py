@@ -0,0 +1,132 @@
+import csv
+import os
+import re
+import time
+from datetime import date, datetime
+from itertools import islice
+
+import metrics
+from player_registry import get_registry
+from publish import atomic_path
+from rankings_parser import SNAPSHOT_HEADER, parse_rankings_html, validated
+from scrape_state import RankingsUnchanged, detect_changes
+
+# save_to_csv() names files {prefix}_{YYYY-MM-DD}.csv
+SNAPSHOT_NAME = re.compile(r"(?P<prefix>[a-z_]+?)_(?P<date>\d{4}-\d{2}-\d{2})\.csv$")
+
+
+def save_to_csv(data, folder='atp_rankings_data', prefix='atp_rankings', registry=None):
+    """
+    Stream rows into a temp file as they arrive and swap it into place.
+
+    data can be any iterable, including a generator pipeline; if it raises
+    (invalid or unchanged rankings) the temp file is removed and nothing is
+    written. Rows are only sorted when they arrived out of rank order.
+    Each row gets its player's registry ID appended.
+    """
+    registry = registry or get_registry()
+    # Sources sharing a folder save from several threads at once
+    os.makedirs(folder, exist_ok=True)
+
+    filename = f"{folder}/{prefix}_{datetime.now().strftime('%Y-%m-%d')}.csv"
+    count = 0
+    last_rank = 0
+    in_order = True
+    # Parsing happens lazily inside the loop, so split its time from writing
+    write_time = 0.0
+    started = time.perf_counter()
+
+    with atomic_path(filename) as tmp_filename:
+        with open(tmp_filename, mode='w', newline='', encoding='utf-8') as file:
+            writer = csv.writer(file)
+            writer.writerow(SNAPSHOT_HEADER)
+            for row in data:
+                row_started = time.perf_counter()
+                rank = int(row[0])
+                if rank < last_rank:
+                    in_order = False
+                last_rank = rank
+                writer.writerow(list(row) + [registry.id_for(row[1])])
+                count += 1
+                write_time += time.perf_counter() - row_started
+
+        metrics.add_time("parse_rows", time.perf_counter() - started - write_time)
+
+        if not in_order:
+            with metrics.span("csv_write"):
+                sort_csv_by_rank(tmp_filename)
+
+    with metrics.span("csv_write"):
+        registry.save()
+    metrics.add_time("csv_write", write_time)
+
+    print(f"Data saved to {filename} ({count} rows)", flush=True)
+    return filename
+
+
+def sort_csv_by_rank(filename):
+    with open(filename, newline='', encoding='utf-8') as file:
+        reader = csv.reader(file)
+        header = next(reader)
+        rows = sorted(reader, key=lambda x: int(x[0]))
+
+    with open(filename, mode='w', newline='', encoding='utf-8') as file:
+        writer = csv.writer(file)
+        writer.writerow(header)
+        writer.writerows(rows)
+
+
+def save_rankings_page(html, state, new_state, folder='atp_rankings_data', prefix='atp_rankings',
+                       max_consecutive_invalid=10):
+    """
+    Run one page through parse -> validate -> change detection -> CSV.
+
+    Raises InvalidRankings or RankingsUnchanged without writing anything.
+    new_state (validators, table hash) is merged into state on success and
+    on RankingsUnchanged, where it describes the same rows.
+    """
+    rows = parse_rankings_html(html, max_consecutive_invalid)
+    try:
+        filename = save_to_csv(detect_changes(validated(rows), state), folder, prefix)
+    except RankingsUnchanged:
+        state.update(new_state)
+        raise
+    state.update(new_state)
+    return filename
+
+
+def parse_snapshot_name(path):
+    """
+    Return (prefix, date) from a name like atp_rankings_2025-03-10.csv, or (None, None)
+    """
+    match = SNAPSHOT_NAME.search(os.path.basename(path))
+    if not match:
+        return None, None
+    return match.group("prefix"), date.fromisoformat(match.group("date"))
+
+
+def snapshot_identity(path, source=None, snapshot_date=None):
+    """
+    (source, date) of a snapshot file: the ones given, or else the ones in
+    its name. Raises ValueError when the name doesn't say.
+    """
+    name_source, name_date = parse_snapshot_name(path)
+    source = source or name_source
+    snapshot_date = snapshot_date or name_date
+    if source is None or snapshot_date is None:
+        raise ValueError(f"Cannot tell source and date of {path}, pass them explicitly")
+    return source, snapshot_date
+
+
+def read_rows(filename):
+    with open(filename, newline='', encoding='utf-8') as file:
+        reader = csv.reader(file)
+        next(reader)
+        return list(reader)
+
+
+def read_head(filename, n=5):
+    with open(filename, newline='', encoding='utf-8') as file:
+        reader = csv.reader(file)
+        next(reader)
+        return list(islice(reader, n))
@@ -0,0 +1,231 @@
+"""
+Append-only trend cube: players per date, country, rank bucket and age bucket
+
+Usage:
+    python trend_cube.py add atp_rankings_data/atp_rankings_2025-03-10.csv [...]
+    python trend_cube.py rebuild [--source atp_rankings]
+    python trend_cube.py show --top 100
+
+Each snapshot appends one block of rows to history/trend_cube.csv, and
+history/trend_cube.index.json records the byte range of every complete
+date. Adding a snapshot reads only the index, so it costs one snapshot's
+worth of work however long the history is. Rank buckets end at the
+dashboard's top N options, so any top N trend is a sum over buckets. A
+date already in the cube is skipped, except a re-scrape of the last one,
+which replaces it; rebuild starts over from the snapshot store.
+"""
+import argparse
+import csv
+import io
+import json
+import os
+
+import pandas as pd
+
+from aggregates import AGE_BINS, AGE_LABELS, TOP_N_OPTIONS, snapshot_csv
+from delta_store import SnapshotStore
+from publish import atomic_path, write_atomic
+from rankings_data import load_rankings
+from snapshots import snapshot_identity
+
+CUBE_FILE = os.environ.get("TREND_CUBE", os.path.join("history", "trend_cube.csv"))
+
+CUBE_HEADER = ["date", "country", "rank_bucket", "age_bucket", "players", "aged", "age_sum"]
+
+# Ranks 1-10 are bucket 10, 11-20 bucket 20, ... 501-1000 bucket 1000
+RANK_BUCKETS = TOP_N_OPTIONS
+
+
+def cube_rows(df, day):
+    """
+    The cube rows of one snapshot frame. Players with no age, or an age
+    outside the dashboard's age groups, have an empty age bucket.
+    """
+    df = df[df["Rank"] <= RANK_BUCKETS[-1]]
+    age = df["Age"].astype("Float64")
+    cells = pd.DataFrame({
+        "country": df["Country"].astype(str),
+        "rank_bucket": pd.cut(df["Rank"], bins=[0] + RANK_BUCKETS, labels=RANK_BUCKETS).astype(int),
+        "age_bucket": pd.cut(age, bins=AGE_BINS, labels=AGE_LABELS).astype(object).fillna(""),
+        "age": age,
+    })
+    grouped = cells.groupby(["country", "rank_bucket", "age_bucket"], sort=True)["age"].agg(
+        players="size", aged="count", age_sum="sum").reset_index()
+    return [[day, country, rank_bucket, age_bucket, int(players), int(aged), int(age_sum)]
+            for country, rank_bucket, age_bucket, players, aged, age_sum in grouped.itertuples(index=False)]
+
+
+def index_file(cube_file=CUBE_FILE):
+    return f"{os.path.splitext(cube_file)[0]}.index.json"
+
+
+def scan_index(cube_file=CUBE_FILE):
+    """
+    Index an existing cube by reading it once, for cubes from before the
+    index. A torn last line drops its whole date, which may be incomplete.
+    """
+    dates = {}
+    last = None
+    with open(cube_file, "rb") as f:
+        size = len(f.readline())
+        for line in f:
+            day, comma, _ = line.decode("utf-8", "replace").partition(",")
+            if not line.endswith(b"\n") or line.count(b",") != len(CUBE_HEADER) - 1:
+                # Unless the line plainly starts the next date
+                if last is not None and (not comma or day == last):
+                    size = dates.pop(last)[0]
+                break
+            last = day
+            dates.setdefault(day, [size, size])[1] = size + len(line)
+            size += len(line)
+    return {"size": size, "dates": dates}
+
+
+def read_index(cube_file=CUBE_FILE):
+    """
+    {"size": bytes of the cube that are complete, "dates": {date: [start,
+    end]}}, the byte range of every complete date. Bytes past size were
+    appended by a run that never finished.
+    """
+    path = index_file(cube_file)
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    if os.path.exists(cube_file):
+        return scan_index(cube_file)
+    return {"size": 0, "dates": {}}
+
+
+def cube_dates(cube_file=CUBE_FILE):
+    return set(read_index(cube_file)["dates"])
+
+
+def append_rows(rows, cube_file=CUBE_FILE, size=None):
+    """
+    Append rows to the cube, first cutting it back to size bytes when
+    given. Returns the new size of the file, once the rows are on disk.
+    """
+    if not os.path.exists(cube_file):
+        os.makedirs(os.path.dirname(cube_file) or ".", exist_ok=True)
+        size = 0
+    with open(cube_file, "a", newline="", encoding="utf-8") as f:
+        if size is not None:
+            f.truncate(size)
+        writer = csv.writer(f)
+        if size == 0:
+            writer.writerow(CUBE_HEADER)
+        writer.writerows(rows)
+        f.flush()
+        os.fsync(f.fileno())
+        return f.tell()
+
+
+def add_to_cube(csv_path, snapshot_date=None, cube_file=CUBE_FILE):
+    """
+    Append the cube rows of one snapshot CSV. Returns the number of rows
+    added.
+
+    A date already in the cube is skipped, unless it's the one appended
+    last: a re-scrape of the current day replaces its block. Either way
+    only the small index is read. Anything a crashed run left past the
+    indexed size is cut off first, and the index is rewritten once the
+    new rows are on disk, so a date is in it only when complete.
+    """
+    if snapshot_date is None:
+        _, snapshot_date = snapshot_identity(csv_path)
+    day = snapshot_date.isoformat()
+    index = read_index(cube_file)
+    dates = index["dates"]
+    last = max(dates, key=lambda d: dates[d][0], default=None)
+    if day in dates and day != last:
+        return 0
+
+    rows = cube_rows(load_rankings(csv_path), day)
+    start = dates.pop(day)[0] if day in dates else index["size"]
+    index["size"] = append_rows(rows, cube_file, start)
+    dates[day] = [start, index["size"]]
+    write_atomic(index_file(cube_file), json.dumps(index, indent=1, sort_keys=True))
+    return len(rows)
+
+
+def rebuild_cube(source="atp_rankings", cube_file=CUBE_FILE):
+    """
+    A fresh cube of every date in the snapshot store
+    """
+    store = SnapshotStore(source)
+    index = {"size": 0, "dates": {}}
+    added = 0
+    # Without an index the cube is scanned, so a crash before the new one
+    # is written still leaves a readable pair
+    if os.path.exists(index_file(cube_file)):
+        os.remove(index_file(cube_file))
+    with atomic_path(cube_file) as tmp_file:
+        for day, snapshot in store.iter_range():
+            rows = cube_rows(load_rankings(io.StringIO(snapshot_csv(snapshot))), day)
+            start = index["size"]
+            index["size"] = append_rows(rows, tmp_file, start)
+            index["dates"][str(day)] = [start, index["size"]]
+            added += len(rows)
+    write_atomic(index_file(cube_file), json.dumps(index, indent=1, sort_keys=True))
+    return added
+
+
+def read_cube(cube_file=CUBE_FILE):
+    """
+    The complete dates of the cube as one frame
+    """
+    with open(cube_file, "rb") as f:
+        data = f.read(read_index(cube_file)["size"])
+    cube = pd.read_csv(io.BytesIO(data), dtype={"date": str, "country": "category", "age_bucket": str},
+                       keep_default_na=False)
+    return cube.astype({"rank_bucket": "int16", "players": "int32", "aged": "int32", "age_sum": "int32"})
+
+
+def country_trend(cube, top_n):
+    """
+    Players in the top N per date (rows) and country (columns)
+    """
+    top = cube[cube["rank_bucket"] <= top_n]
+    return top.pivot_table(index="date", columns="country", values="players",
+                           aggfunc="sum", fill_value=0, observed=True)
+
+
+def mean_age_trend(cube, top_n):
+    """
+    Mean age of the top N players with a known age, per date
+    """
+    top = cube[cube["rank_bucket"] <= top_n].groupby("date")[["aged", "age_sum"]].sum()
+    return top["age_sum"] / top["aged"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    add = commands.add_parser("add", help="append snapshot CSVs to the cube")
+    add.add_argument("files", nargs="+")
+
+    rebuild = commands.add_parser("rebuild", help="rebuild the cube from the snapshot store")
+    rebuild.add_argument("--source", default="atp_rankings")
+
+    show = commands.add_parser("show", help="print the trends for one top N")
+    show.add_argument("--top", type=int, default=100, choices=RANK_BUCKETS)
+
+    args = parser.parse_args()
+
+    if args.command == "add":
+        for path in args.files:
+            print(f"{path}: {add_to_cube(path)} rows added")
+    elif args.command == "rebuild":
+        print(f"{CUBE_FILE}: {rebuild_cube(args.source)} rows")
+    else:
+        cube = read_cube()
+        counts = country_trend(cube, args.top)
+        leaders = counts.iloc[-1].sort_values(ascending=False).head(8).index
+        print(counts[leaders].to_string())
+        print(f"\nMean age of the top {args.top}:")
+        print(mean_age_trend(cube, args.top).round(2).to_string())
+
+
+if __name__ == "__main__":
+    main()